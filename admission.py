@@ -0,0 +1,189 @@
+import math
+import time
+import threading
+from metrics import REGISTRY
+
+ADMISSION_ACTIVE = REGISTRY.gauge(
+    "spotscrape_admission_active",
+    "Scrapes currently holding an admission slot",
+    ("controller",)
+)
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "spotscrape_admission_queue_depth",
+    "Admitted scrapes waiting for a free slot",
+    ("controller",)
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "spotscrape_admission_wait_seconds",
+    "Time scrapes waited in the admission queue before getting a slot",
+    ("controller",)
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "spotscrape_admission_rejected_total",
+    "Scrapes turned away, by reason (queue_full or timeout)",
+    ("controller", "reason")
+)
+
+CANCEL_POLL_SECONDS = 0.25  # How often a waiting start() checks its cancel event
+
+
+class AdmissionRejected(Exception):
+    """Raised when a scrape cannot be admitted. `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps how many scrapes (and so browsers) run at once, with a bounded wait
+    queue in front of the cap. Callers reserve a place first, which fails
+    straight away when the queue is full, so a burst gets quick 429s instead
+    of piling up threads and Chrome instances.
+
+        ticket = controller.reserve()     # AdmissionRejected when full
+        with ticket:                      # waits for a slot (or times out)
+            scrape()
+    """
+
+    def __init__(self, max_active, max_queued, queue_timeout=120, name="scrape"):
+        """
+        :param max_active: Scrapes allowed to run at the same time
+        :param max_queued: Reserved scrapes allowed to wait for a slot
+        :param queue_timeout: Seconds a reserved scrape waits for a slot before giving up
+        :param name: Label of this controller in metrics
+        """
+        self.max_active = max(1, int(max_active))
+        self.max_queued = max(0, int(max_queued))
+        self.queue_timeout = queue_timeout
+        self.name = name
+        self.admitted = 0
+        self.rejected = 0
+        self._active = 0
+        self._queued = 0
+        self._avg_hold = 30.0  # Moving average of seconds a slot is held, for Retry-After hints
+        self._cond = threading.Condition()
+
+    def reserve(self):
+        """Returns a Ticket holding a place in the queue. Raises AdmissionRejected when it is full."""
+        with self._cond:
+            if self._active + self._queued >= self.max_active + self.max_queued:
+                self.rejected += 1
+                retry_after = self._retry_after()
+                ADMISSION_REJECTED.inc(controller=self.name, reason="queue_full")
+                raise AdmissionRejected("Too many scrapes in progress, try again later", retry_after)
+            self._queued += 1
+            self._publish()
+        return Ticket(self)
+
+    def free_slots(self):
+        """Slots that no running scrape holds and no queued scrape is waiting for."""
+        with self._cond:
+            return max(0, self.max_active - self._active - self._queued)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "max_active": self.max_active,
+                "max_queued": self.max_queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_hold_seconds": round(self._avg_hold, 2),
+                "retry_after": self._retry_after(),
+            }
+
+    def _start(self, timeout, reserved_at, cancel=None):
+        """Takes a slot for a queued ticket. Returns False, giving up the queue place, once `cancel` is set."""
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        with self._cond:
+            while self._active >= self.max_active:
+                if cancel is not None and cancel.is_set():
+                    self._queued -= 1
+                    self._publish()
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queued -= 1
+                    self.rejected += 1
+                    self._publish()
+                    ADMISSION_REJECTED.inc(controller=self.name, reason="timeout")
+                    raise AdmissionRejected("Timed out waiting for a free scrape slot", self._retry_after())
+                # Waits in slices when cancellable, since nothing notifies the condition on cancel
+                self._cond.wait(remaining if cancel is None else min(remaining, CANCEL_POLL_SECONDS))
+            self._queued -= 1
+            self._active += 1
+            self.admitted += 1
+            self._publish()
+        # From reserve(), so time spent queued before start() (e.g. behind busy job workers) counts too
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - reserved_at, controller=self.name)
+        return True
+
+    def _finish(self, held):
+        with self._cond:
+            self._active -= 1
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+            self._publish()
+            self._cond.notify()
+
+    def _cancel(self):
+        with self._cond:
+            self._queued -= 1
+            self._publish()
+
+    def _retry_after(self):
+        # Roughly when the last queued scrape would get a slot
+        waves = (self._queued + 1) / self.max_active
+        return max(1, math.ceil(self._avg_hold * waves))
+
+    def _publish(self):
+        ADMISSION_ACTIVE.set(self._active, controller=self.name)
+        ADMISSION_QUEUED.set(self._queued, controller=self.name)
+
+
+class Ticket:
+    """A place in an AdmissionController's queue; entering it waits for a slot, leaving frees it."""
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._state = "queued"  # queued -> active -> done | cancelled
+        self._reserved_at = time.monotonic()
+        self._started = None
+
+    def start(self, timeout=None, cancel=None):
+        """
+        Waits for a slot. Raises AdmissionRejected on timeout (the ticket is then spent).
+        :param cancel: Optional threading.Event; once set, the wait stops and the queue place is freed
+        :return: True when the slot was taken, False when `cancel` was set first
+        """
+        if self._state != "queued":
+            raise RuntimeError(f"Ticket is {self._state}")
+        try:
+            started = self._controller._start(timeout, self._reserved_at, cancel)
+        except AdmissionRejected:
+            self._state = "cancelled"
+            raise
+        if not started:
+            self._state = "cancelled"
+            return False
+        self._state = "active"
+        self._started = time.monotonic()
+        return True
+
+    def release(self):
+        """Frees the slot, or the queue place of a ticket that never started. Safe to call twice."""
+        if self._state == "active":
+            self._controller._finish(time.monotonic() - self._started)
+            self._state = "done"
+        elif self._state == "queued":
+            self._controller._cancel()
+            self._state = "cancelled"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
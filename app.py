@@ -1,22 +1,254 @@
-from flask import Flask, render_template, request, jsonify, send_file, session, redirect, url_for
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify, send_file, session, redirect, url_for, Response, stream_with_context, g
 from flask_sqlalchemy import SQLAlchemy
-from bs4 import BeautifulSoup
-import requests
+from sqlalchemy.orm import validates
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import datetime
+import time
 import io
 import json
 import os
 import hashlib
+import hmac
 import re
-from spotify_playlist_scraper import SpotifyPlaylistScraper
+import csv
+import base64
+import difflib
+from collections import Counter
+from functools import partial
+from driver_pool import get_driver_pool, BLOCKED_URL_PATTERNS
+from scrape_jobs import ScrapeJobManager
+from metadata_cache import MetadataCache, MemoryStore, SQLiteStore, canonical_url, NOT_MODIFIED
+from exporters import EXPORT_FORMATS, iter_export, gzip_chunks, export_filename
+from youtube_lookup import YouTubeResolver, music_query, ytdlp_video_id, video_links
+from tracks import format_total_duration
+from page_meta import fetch_meta_conditional
+from checkpoints import CheckpointStore
+from track_index import TrackIndexCache
+from metrics import REGISTRY
+from admission import AdmissionController, AdmissionRejected
+from rate_limit import RateLimitExceeded
+from prefetch import PrefetchScheduler, parse_hours
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-db = SQLAlchemy(app)
+db = SQLAlchemy()
 
-@app.context_processor
+# Pages, auth, history, /get-data, YouTube lookups and stored playlists
+main = Blueprint('main', __name__)
+# Endpoints that start or follow scrapes; only registered on scrape-capable workers
+scrape = Blueprint('scrape', __name__)
+
+# 'full' serves everything and runs scrapes; 'web' never imports the Selenium stack
+APP_ROLES = ('full', 'web')
+
+# "Try it" playlists on /playlist; kept warm by the prefetcher unless PREFETCH_PINNED_URLS says otherwise
+SAMPLE_PLAYLISTS = {
+    'tophits': 'https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M',
+    'chill': 'https://open.spotify.com/playlist/37i9dQZF1DX0XUsuxWHRQd',
+    'workout': 'https://open.spotify.com/playlist/37i9dQZF1DX76Wlfdnj7AP',
+}
+
+# Process-wide services, created by create_app() (one app per worker process).
+# driver_pool, checkpoint_store, scrape_admission, scrape_jobs and prefetcher stay None on 'web' workers.
+driver_pool = None
+metadata_cache = None
+youtube_cache = None
+youtube_resolver = None
+checkpoint_store = None
+track_indexes = None
+scrape_admission = None
+scrape_jobs = None
+prefetcher = None
+
+def create_app(config=None):
+    """
+    Builds the Flask app for one worker process.
+
+    APP_ROLE chooses what the worker serves: 'full' (default) adds the scrape
+    endpoints and their browser pool, 'web' leaves them out. The database
+    schema is not checked here; run `flask --app app init-db` once per deploy
+    (`python app.py` does it before starting the dev server).
+
+    :param config: Optional dict overriding the environment-derived config
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'your-secret-key-here'
+    app.config['DRIVER_POOL_SIZE'] = int(os.environ.get('DRIVER_POOL_SIZE', 2))
+    app.config['DRIVER_MAX_USES'] = int(os.environ.get('DRIVER_MAX_USES', 25))
+    app.config['DRIVER_MAX_RSS_MB'] = int(os.environ.get('DRIVER_MAX_RSS_MB', 1024))
+    app.config['DRIVER_BLOCK_RESOURCES'] = os.environ.get('DRIVER_BLOCK_RESOURCES', '1') != '0'
+    app.config['DRIVER_BLOCKED_URLS'] = [p.strip() for p in os.environ.get('DRIVER_BLOCKED_URLS', '').split(',') if p.strip()]  # Extra patterns
+    app.config['SCRAPE_WORKERS'] = int(os.environ.get('SCRAPE_WORKERS', app.config['DRIVER_POOL_SIZE']))
+    app.config['SCRAPE_MAX_BROWSERS'] = int(os.environ.get('SCRAPE_MAX_BROWSERS', app.config['DRIVER_POOL_SIZE']))  # Concurrent scrapes
+    app.config['SCRAPE_QUEUE_SIZE'] = int(os.environ.get('SCRAPE_QUEUE_SIZE', 10))  # Scrapes allowed to wait for a slot
+    app.config['SCRAPE_QUEUE_TIMEOUT'] = int(os.environ.get('SCRAPE_QUEUE_TIMEOUT', 120))
+    app.config['SCRAPE_JOB_TTL'] = int(os.environ.get('SCRAPE_JOB_TTL', 3600))
+    app.config['METADATA_CACHE_BACKEND'] = os.environ.get('METADATA_CACHE_BACKEND', 'memory')  # 'memory' or 'sqlite'
+    app.config['METADATA_CACHE_SIZE'] = int(os.environ.get('METADATA_CACHE_SIZE', 1024))
+    app.config['METADATA_CACHE_TTL'] = int(os.environ.get('METADATA_CACHE_TTL', 3600))
+    app.config['METADATA_CACHE_REVALIDATE_TTL'] = int(os.environ.get('METADATA_CACHE_REVALIDATE_TTL', 24 * 3600))  # Stale pages kept for If-None-Match
+    app.config['METADATA_CACHE_PATH'] = os.environ.get('METADATA_CACHE_PATH', os.path.join(app.instance_path, 'metadata_cache.db'))
+    app.config['YOUTUBE_CACHE_PATH'] = os.environ.get('YOUTUBE_CACHE_PATH', os.path.join(app.instance_path, 'youtube_cache.db'))
+    app.config['SCRAPE_CHECKPOINT_PATH'] = os.environ.get('SCRAPE_CHECKPOINT_PATH', os.path.join(app.instance_path, 'scrape_checkpoints.db'))
+    app.config['SCRAPE_CHECKPOINT_EVERY'] = int(os.environ.get('SCRAPE_CHECKPOINT_EVERY', 200))  # Rows between checkpoint saves
+    app.config['YOUTUBE_CACHE_TTL'] = int(os.environ.get('YOUTUBE_CACHE_TTL', 7 * 24 * 3600))
+    app.config['YOUTUBE_CACHE_SIZE'] = int(os.environ.get('YOUTUBE_CACHE_SIZE', 100000))
+    app.config['YOUTUBE_WORKERS'] = int(os.environ.get('YOUTUBE_WORKERS', 8))
+    app.config['YOUTUBE_BATCH_LIMIT'] = int(os.environ.get('YOUTUBE_BATCH_LIMIT', 100))
+    app.config['TRACK_INDEX_CACHE_SIZE'] = int(os.environ.get('TRACK_INDEX_CACHE_SIZE', 32))  # Playlists kept indexed for /tracks paging
+    app.config['PLAYLIST_FRESHNESS'] = int(os.environ.get('PLAYLIST_FRESHNESS', 6 * 3600))  # Seconds a stored playlist is served without re-scraping
+    app.config['PREFETCH_ENABLED'] = os.environ.get('PREFETCH_ENABLED', '0') != '0'  # Background refresh of popular playlists
+    app.config['PREFETCH_TOP_K'] = int(os.environ.get('PREFETCH_TOP_K', 10))  # Most extracted playlists refreshed per round
+    app.config['PREFETCH_BUDGET'] = int(os.environ.get('PREFETCH_BUDGET', 1))  # Browsers background refreshes may use at once
+    app.config['PREFETCH_INTERVAL'] = int(os.environ.get('PREFETCH_INTERVAL', 1800))
+    app.config['PREFETCH_HOURS'] = os.environ.get('PREFETCH_HOURS', '1-6')  # Off-peak local hours, '' for any hour
+    app.config['PREFETCH_HISTORY_DAYS'] = int(os.environ.get('PREFETCH_HISTORY_DAYS', 7))  # History window used for ranking
+    app.config['PREFETCH_MIN_AGE'] = int(os.environ.get('PREFETCH_MIN_AGE', app.config['PLAYLIST_FRESHNESS'] // 2))  # Younger snapshots are left alone
+    app.config['PREFETCH_ADMIN_TOKEN'] = os.environ.get('PREFETCH_ADMIN_TOKEN', '')  # Bearer token for /prefetch/run and /prefetch/cancel
+    app.config['PREFETCH_PINNED_URLS'] = [u.strip() for u in os.environ.get('PREFETCH_PINNED_URLS', ','.join(SAMPLE_PLAYLISTS.values())).split(',') if u.strip()]
+    app.config['APP_ROLE'] = os.environ.get('APP_ROLE', 'full')
+    app.config.update(config or {})
+    if app.config['APP_ROLE'] not in APP_ROLES:
+        raise ValueError(f"APP_ROLE must be one of {APP_ROLES}, got {app.config['APP_ROLE']!r}")
+
+    db.init_app(app)
+    init_services(app)
+    app.register_blueprint(main)
+    if app.config['APP_ROLE'] == 'full':
+        app.register_blueprint(scrape)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables, columns and indexes."""
+        init_db()
+        print("Database schema is up to date.")
+
+    return app
+
+def init_services(app):
+    global driver_pool, metadata_cache, youtube_cache, youtube_resolver
+    global checkpoint_store, track_indexes, scrape_admission, scrape_jobs, prefetcher
+
+    # Metadata of Spotify pages, shared by /get-data and playlist scrapes
+    if app.config['METADATA_CACHE_BACKEND'] == 'sqlite':
+        os.makedirs(os.path.dirname(app.config['METADATA_CACHE_PATH']), exist_ok=True)
+        metadata_store = SQLiteStore(app.config['METADATA_CACHE_PATH'], max_entries=app.config['METADATA_CACHE_SIZE'])
+    else:
+        metadata_store = MemoryStore(max_entries=app.config['METADATA_CACHE_SIZE'])
+    metadata_cache = MetadataCache(metadata_store, ttl=app.config['METADATA_CACHE_TTL'],
+                                   revalidate_ttl=app.config['METADATA_CACHE_REVALIDATE_TTL'])
+
+    # Persistent query -> YouTube video id cache shared by all workers
+    os.makedirs(os.path.dirname(app.config['YOUTUBE_CACHE_PATH']), exist_ok=True)
+    youtube_cache = MetadataCache(
+        SQLiteStore(app.config['YOUTUBE_CACHE_PATH'], max_entries=app.config['YOUTUBE_CACHE_SIZE']),
+        ttl=app.config['YOUTUBE_CACHE_TTL']
+    )
+    youtube_resolver = YouTubeResolver(youtube_cache, max_workers=app.config['YOUTUBE_WORKERS'])
+
+    # Sort orders and search strings of recently viewed playlists, for paged track queries
+    track_indexes = TrackIndexCache(max_entries=app.config['TRACK_INDEX_CACHE_SIZE'])
+
+    if app.config['APP_ROLE'] != 'full':
+        return
+
+    # Shared Chrome pool for playlist scraping (selenium is imported and browsers
+    # launch lazily, on the first scrape that needs one)
+    driver_pool = get_driver_pool(
+        headless=True,
+        size=app.config['DRIVER_POOL_SIZE'],
+        max_uses=app.config['DRIVER_MAX_USES'],
+        max_rss_mb=app.config['DRIVER_MAX_RSS_MB'],
+        block_resources=app.config['DRIVER_BLOCK_RESOURCES'],
+        blocked_urls=list(BLOCKED_URL_PATTERNS) + app.config['DRIVER_BLOCKED_URLS']
+    )
+
+    # Rows of unfinished browser scrapes, so a retry only scrapes the missing tail
+    os.makedirs(os.path.dirname(app.config['SCRAPE_CHECKPOINT_PATH']), exist_ok=True)
+    checkpoint_store = CheckpointStore(app.config['SCRAPE_CHECKPOINT_PATH'])
+    # Checkpoints of scrapes nobody retried are useless once expired
+    pruned = checkpoint_store.prune()
+    if pruned:
+        print(f"Removed {pruned} expired scrape checkpoints")
+
+    # Caps concurrent scrapes (job and stream alike) behind a bounded queue; overflow gets a 429
+    scrape_admission = AdmissionController(
+        max_active=app.config['SCRAPE_MAX_BROWSERS'],
+        max_queued=app.config['SCRAPE_QUEUE_SIZE'],
+        queue_timeout=app.config['SCRAPE_QUEUE_TIMEOUT']
+    )
+
+    # Background playlist scrapes, polled through /scrape-jobs/<job_id>
+    scrape_jobs = ScrapeJobManager(
+        max_workers=app.config['SCRAPE_WORKERS'],
+        job_ttl=app.config['SCRAPE_JOB_TTL']
+    )
+
+    # Off-peak refreshes of the most extracted playlists, so their next request is served from a snapshot.
+    # Enable it on one worker only: schedulers in different processes do not know about each other.
+    prefetcher = PrefetchScheduler(
+        rank=partial(popular_playlists, app),
+        submit=partial(submit_prefetch, app),
+        top_k=app.config['PREFETCH_TOP_K'],
+        budget=app.config['PREFETCH_BUDGET'],
+        interval=app.config['PREFETCH_INTERVAL'],
+        hours=parse_hours(app.config['PREFETCH_HOURS']),
+        pinned=[canonical_url(u) for u in app.config['PREFETCH_PINNED_URLS']],
+        # Only into browser slots no user scrape is using or waiting for
+        can_start=lambda: scrape_admission.free_slots() > 0
+    )
+    if app.config['PREFETCH_ENABLED']:
+        prefetcher.start()
+
+# --- Metrics ---
+REQUEST_LATENCY = REGISTRY.histogram(
+    'spotscrape_request_duration_seconds', 'Request latency by route', ('route', 'method', 'status'))
+SCRAPES_IN_FLIGHT = REGISTRY.gauge(
+    'spotscrape_scrapes_in_flight', 'Playlist scrapes currently running', ('mode',))
+SCRAPES_TOTAL = REGISTRY.counter(
+    'spotscrape_scrapes_total', 'Finished playlist scrapes by engine and outcome', ('engine', 'status'))
+SCRAPE_PHASE_SECONDS = REGISTRY.histogram(
+    'spotscrape_scrape_phase_seconds', 'Time spent in each scrape phase', ('phase',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'spotscrape_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+DRIVER_POOL_BROWSERS = REGISTRY.gauge(
+    'spotscrape_driver_pool_browsers', 'Chrome instances in the driver pool', ('state',))
+
+def collect_app_metrics():
+    for name, cache in (('metadata', metadata_cache), ('youtube', youtube_cache)):
+        stats = cache.stats()
+        for result in ('hits', 'misses', 'coalesced'):
+            CACHE_REQUESTS.set_total(stats[result], cache=name, result=result)
+    stats = track_indexes.stats()
+    for result in ('hits', 'misses'):
+        CACHE_REQUESTS.set_total(stats[result], cache='track_index', result=result)
+    if driver_pool is not None:
+        for state, value in driver_pool.stats().items():
+            DRIVER_POOL_BROWSERS.set(value, state=state)
+
+REGISTRY.add_collector(collect_app_metrics)
+
+def observe_scrape_phase(name, seconds):
+    SCRAPE_PHASE_SECONDS.observe(seconds, phase=name)
+
+def count_scrape(scraper, data):
+    SCRAPES_TOTAL.inc(engine=scraper.engine_used or 'none', status='done' if data else 'failed')
+
+@main.before_app_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+
+@main.after_app_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Streamed responses are timed until their headers are sent
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.monotonic() - started, route=route, method=request.method,
+                                status=str(response.status_code))
+    return response
+
+@main.app_context_processor
 def inject_user():
     return dict(user_logged_in='user_id' in session)
 
@@ -30,112 +262,506 @@ class User(db.Model):
     security_answer = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
+def spotify_url_type(url):
+    """'track', 'album', 'playlist', 'artist' or 'other' for a Spotify link."""
+    match = re.search(r'/(track|album|playlist|artist)/', url or '')
+    return match.group(1) if match else 'other'
+
 class History(db.Model):
+    __table_args__ = (
+        db.Index('ix_history_user_date', 'user_id', 'date'),
+        db.Index('ix_history_user_type', 'user_id', 'url_type'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200))
     description = db.Column(db.String(500))
     image_url = db.Column(db.String(500))
     spotify_url = db.Column(db.String(500))
+    url_type = db.Column(db.String(20))  # Derived from spotify_url when it is set
     date = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # Relationship to User model
     user = db.relationship('User', backref=db.backref('history', lazy=True, cascade='all, delete-orphan'))
 
+    @validates('spotify_url')
+    def _set_url_type(self, key, url):
+        self.url_type = spotify_url_type(url)
+        return url
+
+class Playlist(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    spotify_url = db.Column(db.String(500), unique=True, nullable=False)  # Canonical URL
+    title = db.Column(db.String(200))
+    description = db.Column(db.String(500))
+    owner = db.Column(db.String(200))
+    image_url = db.Column(db.String(500))
+    total_tracks_declared = db.Column(db.Integer)
+    track_count = db.Column(db.Integer, default=0)
+    total_duration_seconds = db.Column(db.Integer, default=0)
+    scraped_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    complete = db.Column(db.Boolean, default=True, nullable=False)  # False when fewer tracks than declared were scraped
+
+class Track(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    track_key = db.Column(db.String(40), unique=True, nullable=False)  # sha1 of title/artist/album
+    title = db.Column(db.String(500))
+    artist = db.Column(db.String(500))
+    album = db.Column(db.String(500))
+    duration = db.Column(db.String(10))
+    image_url = db.Column(db.String(500))
+
+class PlaylistTrack(db.Model):
+    # Ordered membership: one row per position in the latest snapshot
+    playlist_id = db.Column(db.Integer, db.ForeignKey('playlist.id'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    track_id = db.Column(db.Integer, db.ForeignKey('track.id'), nullable=False, index=True)
+
+class PlaylistSnapshot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    playlist_id = db.Column(db.Integer, db.ForeignKey('playlist.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    track_count = db.Column(db.Integer)
+    added = db.Column(db.Integer, default=0)
+    removed = db.Column(db.Integer, default=0)
+    moved = db.Column(db.Integer, default=0)
+    diff = db.Column(db.Text)  # JSON: track ids added / removed / moved since the previous snapshot
+
 # --- Scraper Function ---
 def scrape_spotify(url):
+    return revalidate_spotify(url)[0]
+
+def revalidate_spotify(url, validators=None):
+    """scrape_spotify() for MetadataCache.get_or_revalidate(): -> (data, NOT_MODIFIED or None; validators)"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            return None
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract Meta Tags
-        title = soup.find("meta", property="og:title")
-        desc = soup.find("meta", property="og:description")
-        image = soup.find("meta", property="og:image")
-        
-        if not title: return None
+        # Only the page head is downloaded and parsed, and nothing when the cached copy is still current
+        status, og, validators = fetch_meta_conditional(url, validators, headers=headers)
+        if status == 304: return NOT_MODIFIED, validators
+        if not og or "og:title" not in og: return None, {}
 
         return {
-            "title": title["content"],
-            "description": desc["content"] if desc else "No description",
-            "image_url": image["content"] if image else "https://via.placeholder.com/300",
+            "title": og["og:title"],
+            "description": og.get("og:description", "No description"),
+            "image_url": og.get("og:image", "https://via.placeholder.com/300"),
             "spotify_url": url
-        }
+        }, validators
+    except RateLimitExceeded:
+        raise
     except:
+        return None, {}
+
+def history_counts(user_id):
+    """Extractions per URL type for a user, from one GROUP BY over ix_history_user_type."""
+    rows = (db.session.query(History.url_type, db.func.count(History.id))
+            .filter(History.user_id == user_id)
+            .group_by(History.url_type)
+            .all())
+    counts = {url_type or 'other': count for url_type, count in rows}
+    counts['total'] = sum(count for _, count in rows)
+    return counts
+
+def encode_history_cursor(item):
+    raw = f"{item.date.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    date, item_id = raw.rsplit('|', 1)
+    return datetime.datetime.fromisoformat(date), int(item_id)
+
+def history_query(user_id, search=None, url_type=None):
+    query = History.query.filter(History.user_id == user_id)
+    if url_type and url_type != 'all':
+        query = query.filter(History.url_type == url_type)
+    if search:
+        # The search is literal text: %, _ and the escape character itself are escaped
+        term = search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        pattern = f"%{term}%"
+        query = query.filter(db.or_(db.func.lower(History.title).like(pattern, escape='\\'),
+                                    db.func.lower(History.description).like(pattern, escape='\\')))
+    return query.order_by(History.date.desc(), History.id.desc())
+
+def history_page(user_id, cursor=None, limit=20, search=None, url_type=None):
+    """
+    One page of a user's history, newest first, using keyset pagination on (date, id)
+    so every page is an index range scan no matter how deep it is.
+    :return: (items, next_cursor or None)
+    """
+    query = history_query(user_id, search, url_type)
+    if cursor:
+        date, item_id = decode_history_cursor(cursor)
+        query = query.filter(db.or_(History.date < date,
+                                    db.and_(History.date == date, History.id < item_id)))
+    items = query.limit(limit + 1).all()
+    next_cursor = encode_history_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def history_item_dict(item):
+    return {
+        'id': item.id,
+        'title': item.title,
+        'description': item.description,
+        'image_url': item.image_url,
+        'spotify_url': item.spotify_url,
+        'url_type': item.url_type,
+        'date': item.date.isoformat() + 'Z'
+    }
+
+def upgrade_schema():
+    """Adds columns and indexes introduced after a database was created."""
+    inspector = db.inspect(db.engine)
+    columns = {c['name'] for c in inspector.get_columns('history')}
+    playlist_columns = {c['name'] for c in inspector.get_columns('playlist')}
+    with db.engine.begin() as conn:
+        if 'complete' not in playlist_columns:
+            print("Adding playlist.complete...")
+            conn.execute(db.text("ALTER TABLE playlist ADD COLUMN complete BOOLEAN NOT NULL DEFAULT 1"))
+            conn.execute(db.text(
+                "UPDATE playlist SET complete = 0 "
+                "WHERE total_tracks_declared IS NOT NULL AND track_count < total_tracks_declared"
+            ))
+        if 'url_type' not in columns:
+            print("Adding history.url_type...")
+            conn.execute(db.text("ALTER TABLE history ADD COLUMN url_type VARCHAR(20)"))
+            conn.execute(db.text(
+                "UPDATE history SET url_type = CASE "
+                "WHEN spotify_url LIKE '%/track/%' THEN 'track' "
+                "WHEN spotify_url LIKE '%/album/%' THEN 'album' "
+                "WHEN spotify_url LIKE '%/playlist/%' THEN 'playlist' "
+                "WHEN spotify_url LIKE '%/artist/%' THEN 'artist' "
+                "ELSE 'other' END"
+            ))
+        conn.execute(db.text("CREATE INDEX IF NOT EXISTS ix_history_user_date ON history (user_id, date)"))
+        conn.execute(db.text("CREATE INDEX IF NOT EXISTS ix_history_user_type ON history (user_id, url_type)"))
+
+# --- Playlist Store ---
+def track_key(track):
+    raw = '\x1f'.join([track.get('title', ''), track.get('artist', ''), track.get('album', '')]).lower()
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def upsert_tracks(tracks):
+    """
+    Bulk-inserts unseen tracks. Returns the track ids in playlist order.
+    Rows another scrape inserted in the meantime are skipped, not duplicated.
+    """
+    keys = [track_key(t) for t in tracks]
+    ids = {}
+    unique_keys = list(dict.fromkeys(keys))
+    for i in range(0, len(unique_keys), 500):
+        chunk = unique_keys[i:i + 500]
+        ids.update(db.session.query(Track.track_key, Track.id).filter(Track.track_key.in_(chunk)).all())
+
+    missing = {}
+    for key, t in zip(keys, tracks):
+        if key not in ids and key not in missing:
+            missing[key] = {
+                'track_key': key,
+                'title': t.get('title'),
+                'artist': t.get('artist'),
+                'album': t.get('album'),
+                'duration': t.get('duration'),
+                'image_url': t.get('image_url')
+            }
+    if missing:
+        db.session.execute(sqlite_insert(Track).on_conflict_do_nothing(index_elements=['track_key']),
+                           list(missing.values()))
+        new_keys = list(missing)
+        for i in range(0, len(new_keys), 500):
+            chunk = new_keys[i:i + 500]
+            ids.update(db.session.query(Track.track_key, Track.id).filter(Track.track_key.in_(chunk)).all())
+
+    return [ids[key] for key in keys]
+
+def diff_track_ids(old_ids, new_ids):
+    """
+    Compares two ordered track id lists.
+    Tracks outside the longest matching blocks that appear on both sides count as moved.
+    """
+    matcher = difflib.SequenceMatcher(None, old_ids, new_ids, autojunk=False)
+    unmatched_old, unmatched_new = Counter(), Counter()
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            unmatched_old.update(old_ids[i1:i2])
+            unmatched_new.update(new_ids[j1:j2])
+    moved = unmatched_old & unmatched_new
+    return {
+        'added': list((unmatched_new - moved).elements()),
+        'removed': list((unmatched_old - moved).elements()),
+        'moved': list(moved.elements())
+    }
+
+def is_complete_scrape(data):
+    """False when the scrape returned fewer tracks than the playlist declares (e.g. it stalled)."""
+    declared = data['playlist_info'].get('total_tracks_declared')
+    return not declared or len(data['tracks']) >= declared
+
+def save_playlist_snapshot(data):
+    """
+    Stores a scrape result. Only membership rows whose track changed are written,
+    and the diff against the previous snapshot is recorded.
+
+    Incomplete results are stored flagged (never served as fresh) unless a
+    complete snapshot exists, which they do not replace. Diffs are only
+    computed between two complete track lists.
+    :return: (playlist id, diff or None, stored): stored is False when an incomplete
+             result was dropped in favour of the stored snapshot
+    """
+    info = data['playlist_info']
+    url = canonical_url(info['url'])
+    complete = is_complete_scrape(data)
+    playlist = Playlist.query.filter_by(spotify_url=url).first()
+    if playlist is None:
+        # Two first scrapes of a URL may both get here; the second one updates the first one's row
+        db.session.execute(sqlite_insert(Playlist).values(spotify_url=url, complete=complete)
+                           .on_conflict_do_nothing(index_elements=['spotify_url']))
+        playlist = Playlist.query.filter_by(spotify_url=url).one()
+    if not complete and playlist.complete:
+        print(f"Keeping the stored snapshot of {url}: scrape returned {len(data['tracks'])}/{info['total_tracks_declared']} tracks")
+        return playlist.id, None, False
+    has_baseline = playlist.complete and complete
+
+    playlist.title = info['title']
+    playlist.description = info['description']
+    playlist.owner = info['owner']
+    playlist.image_url = info['image_url']
+    playlist.total_tracks_declared = info['total_tracks_declared']
+    playlist.track_count = len(data['tracks'])
+    playlist.total_duration_seconds = info['total_duration_seconds']
+    playlist.scraped_at = datetime.datetime.utcnow()
+    playlist.complete = complete
+
+    new_ids = upsert_tracks(data['tracks'])
+    old_rows = dict(db.session.query(PlaylistTrack.position, PlaylistTrack.track_id)
+                    .filter_by(playlist_id=playlist.id).all())
+    old_ids = [old_rows[pos] for pos in sorted(old_rows)]
+
+    inserts, updates = [], []
+    for position, track_id in enumerate(new_ids, 1):
+        row = {'playlist_id': playlist.id, 'position': position, 'track_id': track_id}
+        if position not in old_rows:
+            inserts.append(row)
+        elif old_rows[position] != track_id:
+            updates.append(row)
+    if inserts:
+        db.session.bulk_insert_mappings(PlaylistTrack, inserts)
+    if updates:
+        db.session.bulk_update_mappings(PlaylistTrack, updates)
+    if len(old_ids) > len(new_ids):
+        PlaylistTrack.query.filter(PlaylistTrack.playlist_id == playlist.id,
+                                   PlaylistTrack.position > len(new_ids)).delete()
+
+    # Against a partial list, the missing tracks would all show up as added
+    diff = diff_track_ids(old_ids, new_ids) if has_baseline else {'added': [], 'removed': [], 'moved': []}
+    db.session.add(PlaylistSnapshot(
+        playlist_id=playlist.id,
+        track_count=len(new_ids),
+        added=len(diff['added']),
+        removed=len(diff['removed']),
+        moved=len(diff['moved']),
+        diff=json.dumps(diff)
+    ))
+    db.session.commit()
+    return playlist.id, diff, True
+
+def stored_playlist_info(playlist, url=None):
+    return {
+        'title': playlist.title,
+        'owner': playlist.owner,
+        'description': playlist.description,
+        'image_url': playlist.image_url,
+        'url': url or playlist.spotify_url,
+        'total_tracks_declared': playlist.total_tracks_declared,
+        'total_tracks_scraped': playlist.track_count,
+        'total_duration_str': format_total_duration(playlist.total_duration_seconds),
+        'total_duration_seconds': playlist.total_duration_seconds or 0
+    }
+
+def iter_stored_tracks(playlist_id, batch_size=500):
+    """Yields a stored playlist's tracks in order without loading them all at once."""
+    rows = (db.session.query(PlaylistTrack.position, Track)
+            .join(Track, Track.id == PlaylistTrack.track_id)
+            .filter(PlaylistTrack.playlist_id == playlist_id)
+            .order_by(PlaylistTrack.position)
+            .yield_per(batch_size))
+    for position, t in rows:
+        yield {
+            'title': t.title,
+            'artist': t.artist,
+            'album': t.album,
+            'duration': t.duration,
+            'image_url': t.image_url,
+            'index': position
+        }
+
+def playlist_is_fresh(url, max_age):
+    """True when a complete snapshot of the playlist newer than max_age seconds is stored."""
+    scraped_at = (db.session.query(Playlist.scraped_at)
+                  .filter_by(spotify_url=canonical_url(url), complete=True).scalar())
+    return scraped_at is not None and (datetime.datetime.utcnow() - scraped_at).total_seconds() <= max_age
+
+def load_playlist(url, max_age=None):
+    """Returns the stored playlist in scrape() format, or None if missing, incomplete or older than max_age seconds."""
+    playlist = Playlist.query.filter_by(spotify_url=canonical_url(url)).first()
+    if playlist is None or not playlist.complete:
         return None
+    if max_age is not None and (datetime.datetime.utcnow() - playlist.scraped_at).total_seconds() > max_age:
+        return None
+
+    return {
+        'playlist_info': stored_playlist_info(playlist, url),
+        'tracks': list(iter_stored_tracks(playlist.id)),
+        'snapshot': {
+            'source': 'store',
+            'playlist_id': playlist.id,
+            'scraped_at': playlist.scraped_at.isoformat() + 'Z'
+        }
+    }
+
+def previous_snapshot(url):
+    """load_playlist() of the complete snapshot kept when a newer scrape came back partial."""
+    data = load_playlist(url)
+    data['snapshot']['source'] = 'previous'
+    return data
+
+# --- Conditional Responses ---
+def conditional_json(payload):
+    """
+    jsonify() with a strong ETag (SHA-256 of the body). A GET whose
+    If-None-Match carries that tag gets an empty 304 instead of the body.
+    """
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    # Clients may keep the body but must revalidate it; private since history is per user
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 # --- Routes ---
 
-@app.route('/')
+@main.app_errorhandler(AdmissionRejected)
+@main.app_errorhandler(RateLimitExceeded)
+def too_busy(e):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+@main.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/history')
+@main.route('/history')
 def history():
     if 'user_id' not in session:
-        return redirect(url_for('signin'))
+        return redirect(url_for('main.signin'))
     
     user_id = session['user_id']
-    # Get last 20 searches for logged-in user only
-    items = History.query.filter_by(user_id=user_id).order_by(History.date.desc()).limit(20).all()
-    return render_template('history.html', items=items)
+    # First page of searches for logged-in user only, the rest comes from /api/history
+    items, next_cursor = history_page(user_id)
+    return render_template('history.html', items=items, next_cursor=next_cursor)
 
-@app.route('/playlist')
+@main.route('/api/history')
+def api_history():
+    """?cursor=&limit=&q=&type= -> {"items": [...], "next_cursor": ...}"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    try:
+        items, next_cursor = history_page(session['user_id'],
+                                          cursor=request.args.get('cursor'),
+                                          limit=limit,
+                                          search=request.args.get('q', '').strip() or None,
+                                          url_type=request.args.get('type'))
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return conditional_json({'items': [history_item_dict(item) for item in items], 'next_cursor': next_cursor})
+
+@main.route('/api/history/export')
+def api_history_export():
+    """Streams the user's full history as ?format=json (default) or csv."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    fmt = request.args.get('format', 'json').lower()
+    if fmt not in ('json', 'csv'):
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    rows = history_query(session['user_id']).yield_per(500)
+
+    def generate_json():
+        yield '['
+        for i, item in enumerate(rows):
+            yield (',\n' if i else '\n') + json.dumps(history_item_dict(item), ensure_ascii=False)
+        yield '\n]\n'
+
+    def generate_csv():
+        columns = ['id', 'title', 'description', 'image_url', 'spotify_url', 'url_type', 'date']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for item in rows:
+            row = history_item_dict(item)
+            writer.writerow([row[c] for c in columns])
+            if buffer.tell() > 16384:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    generate = generate_json if fmt == 'json' else generate_csv
+    mimetype = 'application/json' if fmt == 'json' else 'text/csv'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="spotscrape_history.{fmt}"'})
+
+@main.route('/playlist')
 def playlist():
-    return render_template('playlist.html')
+    return render_template('playlist.html', sample_playlists=SAMPLE_PLAYLISTS)
 
-@app.route('/stats')
+@main.route('/stats')
 def stats():
     if 'user_id' not in session:
-        return redirect(url_for('signin'))
+        return redirect(url_for('main.signin'))
     
     user_id = session['user_id']
     user = User.query.get(user_id)
     
     # Calculate user-specific statistics
-    total_extractions = History.query.filter_by(user_id=user_id).count()
-    unique_tracks = History.query.filter_by(user_id=user_id).filter(History.spotify_url.contains('/track/')).count()
-    playlists_count = History.query.filter_by(user_id=user_id).filter(History.spotify_url.contains('/playlist/')).count()
-    albums_count = History.query.filter_by(user_id=user_id).filter(History.spotify_url.contains('/album/')).count()
+    counts = history_counts(user_id)
     
     return render_template('stats.html', 
-                         total_extractions=total_extractions,
-                         unique_tracks=unique_tracks,
-                         playlists_count=playlists_count,
-                         albums_count=albums_count,
+                         total_extractions=counts['total'],
+                         unique_tracks=counts.get('track', 0),
+                         playlists_count=counts.get('playlist', 0),
+                         albums_count=counts.get('album', 0),
                          username=user.username,
                          member_since=user.created_at.strftime('%B %Y'))
 
-@app.route('/signin')
+@main.route('/signin')
 def signin():
     return render_template('signin.html')
 
-@app.route('/signup')
+@main.route('/signup')
 def signup():
     return render_template('signup.html')
 
-@app.route('/forgot-password')
+@main.route('/forgot-password')
 def forgot_password():
     return render_template('forgot_password.html')
 
-@app.route('/faqs')
+@main.route('/faqs')
 def faqs():
     return render_template('faqs.html')
 
-@app.route('/settings')
+@main.route('/settings')
 def settings():
     if 'user_id' not in session:
-        return redirect(url_for('signin'))
+        return redirect(url_for('main.signin'))
     
     user_id = session['user_id']
     user = User.query.get(user_id)
-    total_extractions = History.query.filter_by(user_id=user_id).count()
+    total_extractions = History.query.filter_by(user_id=user_id).count()  # Served by ix_history_user_date
     
     return render_template('settings.html',
                          username=user.username,
@@ -143,23 +769,24 @@ def settings():
                          member_since=user.created_at.strftime('%B %Y'),
                          total_extractions=total_extractions)
 
-@app.route('/privacy')
+@main.route('/privacy')
 def privacy():
     return render_template('privacy.html')
 
-@app.route('/about')
+@main.route('/about')
 def about():
     return render_template('about.html')
 
-@app.route('/get-data', methods=['POST'])
+@main.route('/get-data', methods=['POST'])
 def get_data():
     url = request.json.get('url')
     if not url or 'spotify.com' not in url:
         return jsonify({'error': 'Invalid Spotify URL'}), 400
 
-    data = scrape_spotify(url)
+    data = metadata_cache.get_or_revalidate(url, partial(revalidate_spotify, url))
     
     if data:
+        data = dict(data, spotify_url=url)
         # Only store history for logged-in users
         if 'user_id' in session:
             new_entry = History(
@@ -171,11 +798,25 @@ def get_data():
             )
             db.session.add(new_entry)
             db.session.commit()
-        return jsonify(data)
+        return conditional_json(data)
     else:
         return jsonify({'error': 'Could not extract data. Page might be restricted or invalid.'}), 500
 
-@app.route('/download-json', methods=['POST'])
+@main.route('/cache-stats')
+def cache_stats():
+    return jsonify(dict(metadata_cache.stats(), youtube=youtube_cache.stats(), track_index=track_indexes.stats()))
+
+@scrape.route('/scrape-queue')
+def scrape_queue():
+    """Admission controller state: running and queued scrapes, rejections, Retry-After estimate."""
+    return jsonify(scrape_admission.stats())
+
+@main.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, scrape, cache and upstream metrics."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@main.route('/download-json', methods=['POST'])
 def download_json():
     data = request.json
     # Create an in-memory file
@@ -184,105 +825,444 @@ def download_json():
     mem.seek(0)
     return send_file(mem, as_attachment=True, download_name='spotify_data.json', mimetype='application/json')
 
-@app.route('/scrape-playlist', methods=['POST'])
+def run_playlist_scrape(app, job, refresh=False, ticket=None):
+    """
+    Runs on a scrape job thread, so the app is passed in rather than taken from current_app.
+    :param ticket: Admission ticket reserved when the job was submitted; the scrape
+                   waits for a slot with it and frees the slot when done
+    """
+    def on_progress(collected, expected):
+        job.collected = collected
+        job.expected = expected
+
+    try:
+        with app.app_context():
+            # Cancelled while queued: only the ticket needs releasing (below)
+            if job.cancel_requested:
+                return None
+
+            # Serve a recent snapshot instead of launching a scrape
+            if not refresh:
+                data = load_playlist(job.url, max_age=app.config['PLAYLIST_FRESHNESS'])
+                if data:
+                    job.collected = job.expected = data['playlist_info']['total_tracks_scraped']
+                    return data
+
+            # Waits for a free scrape slot; AdmissionRejected fails the job, a cancel stops the wait
+            ticket = ticket or scrape_admission.reserve()
+            if not ticket.start(cancel=job.cancel_event) or job.cancel_requested:
+                return None
+
+            from spotify_playlist_scraper import SpotifyPlaylistScraper  # Pulls in selenium on first use
+            scraper = SpotifyPlaylistScraper(job.url, headless=True, driver_pool=driver_pool, on_progress=on_progress,
+                                             metadata_cache=metadata_cache, on_phase=observe_scrape_phase,
+                                             checkpoint_store=checkpoint_store,
+                                             checkpoint_every=app.config['SCRAPE_CHECKPOINT_EVERY'])
+            data = None
+            tracks = scraper.iter_tracks()
+            try:
+                with SCRAPES_IN_FLIGHT.track_inprogress(mode='job'):
+                    for _ in tracks:
+                        # Cancelled jobs stop at the next track; collected rows stay checkpointed
+                        if job.cancel_requested:
+                            break
+                    else:
+                        data = scraper.data
+            finally:
+                tracks.close()
+                ticket.release()
+                count_scrape(scraper, data)
+                job.timings = scraper.timing_report
+            if data:
+                job.collected = data['playlist_info']['total_tracks_scraped']
+                playlist_id, diff, stored = save_playlist_snapshot(data)
+                if not stored:
+                    # A partial scrape never replaces a complete snapshot, so that one is served
+                    data = previous_snapshot(job.url)
+                    job.collected = data['playlist_info']['total_tracks_scraped']
+                    return data
+                data['snapshot'] = {
+                    'source': 'scrape',
+                    'playlist_id': playlist_id,
+                    'scraped_at': datetime.datetime.utcnow().isoformat() + 'Z',
+                    'complete': is_complete_scrape(data),
+                    'diff': {name: len(ids) for name, ids in diff.items()} if diff is not None else None
+                }
+            return data
+    finally:
+        # Frees the queue place when no scrape ran (snapshot served, error before the scrape)
+        if ticket:
+            ticket.release()
+
+def save_playlist_history(app, user_id):
+    def on_done(job):
+        if job.status != 'done':
+            return
+        info = job.result['playlist_info']
+        with app.app_context():
+            new_entry = History(
+                title=info['title'],
+                description=info['description'],
+                image_url=info['image_url'],
+                spotify_url=job.url,
+                user_id=user_id
+            )
+            db.session.add(new_entry)
+            db.session.commit()
+    return on_done
+
+def popular_playlists(app, limit):
+    """[(canonical playlist URL, extractions)] over the last PREFETCH_HISTORY_DAYS, most extracted first."""
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=app.config['PREFETCH_HISTORY_DAYS'])
+    with app.app_context():
+        rows = (db.session.query(History.spotify_url, db.func.count(History.id))
+                .filter(History.url_type == 'playlist', History.date >= since)
+                .group_by(History.spotify_url)
+                .all())
+    # Links differing only by ?si=, locale prefix... count as one playlist
+    counts = Counter()
+    for url, count in rows:
+        counts[canonical_url(url)] += count
+    return counts.most_common(limit)
+
+def submit_prefetch(app, url):
+    """Starts a background refresh of `url` as a scrape job, or returns None when it is not needed now."""
+    with app.app_context():
+        if playlist_is_fresh(url, app.config['PREFETCH_MIN_AGE']):
+            return None
+    key = f"{canonical_url(url)}|refresh=True"
+    if scrape_jobs.in_flight(key) is not None:
+        return None  # Someone already refreshes it
+    try:
+        ticket = scrape_admission.reserve()
+    except AdmissionRejected:
+        return None
+    job, created = scrape_jobs.submit(url, partial(run_playlist_scrape, app, refresh=True, ticket=ticket), key=key)
+    if not created:
+        ticket.release()
+        return None
+    return job
+
+def export_response(playlist_info, tracks):
+    """Streams tracks as ?format=json|ndjson|csv, gzip-compressed with ?gzip=1."""
+    fmt = request.args.get('format', 'json').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    compressed = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    chunks = iter_export(playlist_info, tracks, fmt)
+    if compressed:
+        chunks = gzip_chunks(chunks)
+    mimetype = 'application/gzip' if compressed else EXPORT_FORMATS[fmt][0]
+    filename = export_filename(playlist_info.get('title'), fmt, compressed)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@main.route('/export/playlist/<int:playlist_id>')
+def export_playlist(playlist_id):
+    playlist = Playlist.query.get(playlist_id)
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+    return export_response(stored_playlist_info(playlist), iter_stored_tracks(playlist.id))
+
+@scrape.route('/export/job/<job_id>')
+def export_job(job_id):
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'done':
+        return jsonify({'error': 'Job has no result yet'}), 409
+    return export_response(job.result['playlist_info'], iter(job.result['tracks']))
+
+@scrape.route('/scrape-playlist', methods=['POST'])
 def scrape_playlist():
     url = request.json.get('url')
     if not url or 'spotify.com/playlist/' not in url:
         return jsonify({'error': 'Invalid Spotify playlist URL'}), 400
 
+    # Refresh re-scrapes even when a fresh snapshot is stored
+    refresh = bool(request.json.get('refresh'))
+
+    # A new scrape needs a place in the admission queue (429 when full); joining a
+    # running job or serving a fresh snapshot does not
+    key = f"{canonical_url(url)}|refresh={refresh}"
+    # A refresh already running (a user's or a prefetch) answers plain requests too
+    refresh_key = f"{canonical_url(url)}|refresh=True"
+    if not refresh and scrape_jobs.in_flight(refresh_key) is not None:
+        key = refresh_key
+    ticket = None
+    if scrape_jobs.in_flight(key) is None and (refresh or not playlist_is_fresh(url, current_app.config['PLAYLIST_FRESHNESS'])):
+        ticket = scrape_admission.reserve()
+
+    # Only save to history for logged-in users
+    app = current_app._get_current_object()
+    on_done = save_playlist_history(app, session['user_id']) if 'user_id' in session else None
+    job, created = scrape_jobs.submit(url, partial(run_playlist_scrape, app, refresh=refresh, ticket=ticket),
+                                      on_done=on_done, key=key)
+    if ticket and not created:
+        ticket.release()
+
+    response = job.to_dict()
+    response['status_url'] = url_for('scrape.scrape_job_status', job_id=job.id)
+    response['result_url'] = url_for('scrape.scrape_job_result', job_id=job.id)
+    return jsonify(response), 202
+
+@scrape.route('/prefetch')
+def prefetch_status():
+    """Background refresh scheduler: queue in priority order, running refreshes, outcome counts."""
+    return jsonify(dict(prefetcher.stats(), enabled=current_app.config['PREFETCH_ENABLED']))
+
+def prefetch_admin_error():
+    """Error response unless the request carries `Authorization: Bearer <PREFETCH_ADMIN_TOKEN>`."""
+    token = current_app.config['PREFETCH_ADMIN_TOKEN']
+    if not token:
+        return jsonify({'error': 'Prefetch control is disabled (PREFETCH_ADMIN_TOKEN is not set)'}), 403
+    scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        return jsonify({'error': 'Admin token required'}), 401
+    return None
+
+@scrape.route('/prefetch/run', methods=['POST'])
+def prefetch_run():
+    """Queues a round of refreshes now, to run even outside the off-peak hours."""
+    error = prefetch_admin_error()
+    if error:
+        return error
+    if not current_app.config['PREFETCH_ENABLED']:
+        return jsonify({'error': 'Prefetch is disabled (PREFETCH_ENABLED=0)'}), 409
+    return jsonify({'queued': prefetcher.run_now()}), 202
+
+@scrape.route('/prefetch/cancel', methods=['POST'])
+def prefetch_cancel():
+    """Drops queued refreshes and stops running ones; {"url": ...} limits it to one playlist."""
+    error = prefetch_admin_error()
+    if error:
+        return error
+    url = (request.get_json(silent=True) or {}).get('url')
+    return jsonify({'cancelled': prefetcher.cancel(canonical_url(url) if url else None)})
+
+@scrape.route('/scrape-jobs/<job_id>')
+def scrape_job_status(job_id):
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return conditional_json(job.to_dict())
+
+@scrape.route('/scrape-jobs/<job_id>/result')
+def scrape_job_result(job_id):
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status in ('failed', 'cancelled'):
+        return jsonify({'error': job.error}), 500
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 202
+    result = job.result
+    # ?tracks=0 leaves the track list out; pages come from /scrape-jobs/<job_id>/tracks
+    if request.args.get('tracks') in ('0', 'false'):
+        result = {key: value for key, value in result.items() if key != 'tracks'}
+    # ?timings=1 attaches the scraper's per-phase timing report
+    if request.args.get('timings') in ('1', 'true'):
+        result = dict(result, timings=job.timings)
+    return conditional_json(result)
+
+def track_page_response(index):
+    """?offset=&limit=&sort=index|title|artist|album|duration&order=asc|desc&q= -> one page of tracks."""
     try:
-        scraper = SpotifyPlaylistScraper(url, headless=True)
-        data = scraper.scrape()
-        
+        page = index.query(sort=request.args.get('sort', 'index'),
+                           order=request.args.get('order', 'asc').lower(),
+                           q=request.args.get('q', ''),
+                           offset=request.args.get('offset', 0, type=int),
+                           limit=request.args.get('limit', 50, type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return conditional_json(page)
+
+@scrape.route('/scrape-jobs/<job_id>/tracks')
+def scrape_job_tracks(job_id):
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'done':
+        return jsonify({'error': 'Job has no result yet'}), 409
+    return track_page_response(track_indexes.get(('job', job.id), lambda: job.result['tracks']))
+
+@main.route('/api/playlists/<int:playlist_id>/tracks')
+def api_playlist_tracks(playlist_id):
+    playlist = Playlist.query.get(playlist_id)
+    if not playlist:
+        return jsonify({'error': 'Playlist not found'}), 404
+    # A re-scrape changes scraped_at, so the old index is never served for new contents
+    key = ('playlist', playlist.id, playlist.scraped_at)
+    return track_page_response(track_indexes.get(key, lambda: iter_stored_tracks(playlist.id)))
+
+@scrape.route('/scrape-playlist/stream', methods=['POST'])
+def scrape_playlist_stream():
+    """
+    Streams a playlist as NDJSON: one {"type": "meta"} record, one {"type": "track"}
+    record per track as soon as it is found, and a final {"type": "summary"} record
+    with the duration totals (or {"type": "error"}). Pass "timings": true to get the
+    scraper's per-phase timing report in the summary.
+    """
+    url = request.json.get('url')
+    if not url or 'spotify.com/playlist/' not in url:
+        return jsonify({'error': 'Invalid Spotify playlist URL'}), 400
+
+    refresh = bool(request.json.get('refresh'))
+    want_timings = bool(request.json.get('timings'))
+    user_id = session.get('user_id')
+    timings = None
+
+    # Reserved up front so a full queue is a 429 rather than an error record mid-stream
+    ticket = None
+    if refresh or not playlist_is_fresh(url, current_app.config['PLAYLIST_FRESHNESS']):
+        ticket = scrape_admission.reserve()
+
+    def record(kind, **fields):
+        return json.dumps(dict(type=kind, **fields), ensure_ascii=False) + '\n'
+
+    def generate():
+        nonlocal timings, ticket
+        data = None if refresh else load_playlist(url, max_age=current_app.config['PLAYLIST_FRESHNESS'])
         if data:
-            # Only save to history for logged-in users
-            if 'user_id' in session:
-                new_entry = History(
-                    title=data['playlist_info']['title'],
-                    description=data['playlist_info']['description'],
-                    image_url=data['playlist_info']['image_url'],
-                    spotify_url=url,
-                    user_id=session['user_id']
-                )
-                db.session.add(new_entry)
-                db.session.commit()
-            
-            return jsonify(data)
+            if ticket:
+                ticket.release()
+            info = data['playlist_info']
+            yield record('meta', playlist_info=info)
+            for track in data['tracks']:
+                yield record('track', track=track)
         else:
-            return jsonify({'error': 'Could not scrape playlist data'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Scraping failed: {str(e)}'}), 500
+            try:
+                ticket = ticket or scrape_admission.reserve()
+                ticket.start()
+            except AdmissionRejected as e:
+                yield record('error', error=str(e), retry_after=e.retry_after)
+                return
+
+            from spotify_playlist_scraper import SpotifyPlaylistScraper  # Pulls in selenium on first use
+            scraper = SpotifyPlaylistScraper(url, headless=True, driver_pool=driver_pool, metadata_cache=metadata_cache,
+                                             on_phase=observe_scrape_phase, checkpoint_store=checkpoint_store,
+                                             checkpoint_every=current_app.config['SCRAPE_CHECKPOINT_EVERY'])
+            sent_meta = False
+            SCRAPES_IN_FLIGHT.inc(mode='stream')
+            try:
+                for track in scraper.iter_tracks():
+                    if not sent_meta:
+                        yield record('meta', playlist_info={
+                            'title': scraper.meta['title'],
+                            'owner': scraper.meta['owner'],
+                            'description': scraper.meta['description'],
+                            'image_url': scraper.meta['image_url'],
+                            'url': url,
+                            'total_tracks_declared': scraper.meta['total_tracks']
+                        })
+                        sent_meta = True
+                    yield record('track', track=track)
+            except RateLimitExceeded as e:
+                count_scrape(scraper, None)
+                yield record('error', error=str(e), retry_after=e.retry_after)
+                return
+            except Exception as e:
+                count_scrape(scraper, None)
+                yield record('error', error=f'Scraping failed: {str(e)}')
+                return
+            finally:
+                SCRAPES_IN_FLIGHT.dec(mode='stream')
+                ticket.release()
+
+            data = scraper.data
+            count_scrape(scraper, data)
+            timings = scraper.timing_report
+            if not data:
+                yield record('error', error='Could not scrape playlist data')
+                return
+            if not sent_meta:
+                yield record('meta', playlist_info=data['playlist_info'])
+            playlist_id, _, stored = save_playlist_snapshot(data)
+            if stored:
+                data['snapshot'] = {'source': 'scrape', 'playlist_id': playlist_id}
+            else:
+                # The summary then carries the stored header, matching the stored tracks
+                data = previous_snapshot(url)
+
+        if user_id:
+            info = data['playlist_info']
+            db.session.add(History(
+                title=info['title'],
+                description=info['description'],
+                image_url=info['image_url'],
+                spotify_url=url,
+                user_id=user_id
+            ))
+            db.session.commit()
+
+        summary = dict(playlist_info=data['playlist_info'], playlist_id=data['snapshot']['playlist_id'])
+        if want_timings:
+            summary['timings'] = timings
+        yield record('summary', **summary)
 
-@app.route('/get-youtube-url', methods=['POST'])
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+    # Frees the queue place if the client goes away before the stream starts
+    response.call_on_close(lambda: ticket and ticket.release())
+    return response
+
+@main.route('/get-youtube-url', methods=['POST'])
 def get_youtube_url():
     query = request.json.get('query')
     if not query:
         return jsonify({'error': 'No query provided'}), 400
     
     try:
-        # yt-dlp command to get official YouTube watch URL of first result
-        cmd = f'yt-dlp "ytsearch1:{query}" --print "%(webpage_url)s"'
-        
-        # run command and get video URL
-        url = os.popen(cmd).read().strip()
+        # yt-dlp lookup of the first result, cached per query
+        video_id = youtube_resolver.resolve(query, search=ytdlp_video_id, source='ytdlp')
         
-        if url and 'youtube.com' in url:
-            # Convert to embed URL
-            video_id = url.split('watch?v=')[-1].split('&')[0]
-            embed_url = f"https://www.youtube-nocookie.com/embed/{video_id}?autoplay=1&start=30&end=60"
-            return jsonify({
-                'embed_url': embed_url,
-                'youtube_url': url,
-                'video_id': video_id
-            })
+        if video_id:
+            return jsonify(video_links(video_id, embed_params='autoplay=1&start=30&end=60'))
         else:
             return jsonify({'error': 'No video found'}), 404
+    except RateLimitExceeded:
+        raise  # 429 with Retry-After from too_busy()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/get-yt-link-by-music-name', methods=['POST'])
+@main.route('/get-yt-link-by-music-name', methods=['POST'])
 def get_yt_link_by_music_name():
     music_name = request.json.get('music_name') 
     if not music_name:
         return jsonify({'error': 'Music name required'}), 400
 
     try:
-        # Parse "music by artist" format
-        if ' by ' in music_name.lower():
-            parts = music_name.lower().split(' by ')
-            if len(parts) == 2:
-                music = parts[0].strip()
-                artist = parts[1].strip()
-                query = f"{music} {artist}".replace(" ", "+")
-            else:
-                query = music_name.replace(" ", "+")
-        else:
-            query = music_name.replace(" ", "+")
-            
-        url = f"https://www.youtube.com/results?search_query={query}"
-        
-        html = requests.get(url, headers={
-            "User-Agent": "Mozilla/5.0"
-        }).text
-        
-        match = re.search(r'"videoId":"(.*?)"', html)
-        if not match:
+        video_id = youtube_resolver.resolve(music_query(music_name))
+        if not video_id:
             return jsonify({"error": "No video found"}), 404
 
-        video_id = match.group(1)
-        embed_url = f"https://www.youtube-nocookie.com/embed/{video_id}?autoplay=1"
-        youtube_link = f"https://www.youtube.com/watch?v={video_id}"
-
-        return jsonify({
-            "embed_url": embed_url,
-            "youtube_url": youtube_link,
-            "video_id": video_id
-        })
+        return jsonify(video_links(video_id))
 
+    except RateLimitExceeded:
+        raise  # 429 with Retry-After from too_busy()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/delete-history-item/<int:item_id>', methods=['DELETE'])
+@main.route('/get-yt-links-by-music-name', methods=['POST'])
+def get_yt_links_by_music_name():
+    """Batch version of /get-yt-link-by-music-name: {"music_names": [...]} -> {"results": {name: links or null}}"""
+    music_names = request.json.get('music_names')
+    if not isinstance(music_names, list) or not music_names:
+        return jsonify({'error': 'music_names list required'}), 400
+    limit = current_app.config['YOUTUBE_BATCH_LIMIT']
+    if len(music_names) > limit:
+        return jsonify({'error': f"At most {limit} names per request"}), 400
+
+    queries = {name: music_query(name) for name in music_names if isinstance(name, str) and name.strip()}
+    video_ids = youtube_resolver.resolve_many(queries.values())
+    results = {}
+    for name, query in queries.items():
+        video_id = video_ids.get(query)
+        results[name] = video_links(video_id) if video_id else None
+    return jsonify({'results': results})
+
+@main.route('/delete-history-item/<int:item_id>', methods=['DELETE'])
 def delete_history_item(item_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required'}), 401
@@ -296,7 +1276,7 @@ def delete_history_item(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/auth/signin', methods=['POST'])
+@main.route('/auth/signin', methods=['POST'])
 def auth_signin():
     data = request.json
     user = User.query.filter_by(email=data['email']).first()
@@ -305,7 +1285,7 @@ def auth_signin():
         return jsonify({'success': True})
     return jsonify({'error': 'Invalid credentials'}), 401
 
-@app.route('/auth/signup', methods=['POST'])
+@main.route('/auth/signup', methods=['POST'])
 def auth_signup():
     data = request.json
     if User.query.filter_by(email=data['email']).first():
@@ -323,7 +1303,7 @@ def auth_signup():
     session['user_id'] = user.id
     return jsonify({'success': True})
 
-@app.route('/auth/get-security-question', methods=['POST'])
+@main.route('/auth/get-security-question', methods=['POST'])
 def get_security_question():
     data = request.json
     user = User.query.filter_by(email=data['email']).first()
@@ -331,7 +1311,7 @@ def get_security_question():
         return jsonify({'question': user.security_question})
     return jsonify({'error': 'Email not found'}), 404
 
-@app.route('/auth/forgot-password', methods=['POST'])
+@main.route('/auth/forgot-password', methods=['POST'])
 def auth_forgot_password():
     data = request.json
     user = User.query.filter_by(email=data['email']).first()
@@ -341,12 +1321,12 @@ def auth_forgot_password():
         return jsonify({'success': True})
     return jsonify({'error': 'Invalid email or security answer'}), 400
 
-@app.route('/auth/signout')
+@main.route('/auth/signout')
 def auth_signout():
     session.pop('user_id', None)
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/auth/delete-account', methods=['DELETE'])
+@main.route('/auth/delete-account', methods=['DELETE'])
 def auth_delete_account():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -358,7 +1338,7 @@ def auth_delete_account():
     session.pop('user_id', None)
     return jsonify({'success': True})
 
-@app.route('/clear-history')
+@main.route('/clear-history')
 def clear_history():
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required'}), 401
@@ -368,17 +1348,13 @@ def clear_history():
     db.session.commit()
     return jsonify({'success': True})
 
+def init_db():
+    """Creates missing tables and applies upgrade_schema(). Needs an app context."""
+    db.create_all()
+    upgrade_schema()
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
-        try:
-            # Check if the database schema is compatible
-            result = db.session.execute("SELECT user_id FROM history WHERE user_id IS NULL LIMIT 1")
-            # If we reach here, old schema exists with nullable user_id
-            print("Updating database schema...")
-            db.drop_all()
-            db.create_all()
-            print("Database schema updated successfully!")
-        except Exception:
-            # Either table doesn't exist or schema is already correct
-            db.create_all()
-    app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
+        init_db()
+    app.run(debug=True, host='0.0.0.0', port=8000)
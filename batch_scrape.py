@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from spotify_playlist_scraper import SpotifyPlaylistScraper
+from driver_pool import DriverPool
+from exporters import EXPORT_FORMATS, iter_export
+from checkpoints import CheckpointStore
+from metadata_cache import canonical_url
+
+MANIFEST_NAME = "manifest.json"
+
+
+def read_urls(path):
+    """
+    Reads playlist URLs from a text file, one per line.
+    Blank lines and lines starting with # are skipped, duplicates are dropped.
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+
+def output_name(url, fmt):
+    """<playlist id>.<ext> for Spotify URLs, a hash of the URL otherwise."""
+    match = re.search(r'/playlist/([A-Za-z0-9]+)', url)
+    name = match.group(1) if match else hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return f"{name}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def scrape_batch(urls, output_dir, workers=4, fmt="json", headless=True, engine="auto",
+                 metadata_cache=None, checkpoint_store=None, on_result=None):
+    """
+    Scrapes many playlists concurrently and writes one file per playlist plus a manifest.
+
+    Playlists are scraped on `workers` threads sharing a driver pool of the same
+    size, created for the batch and closed when it ends, so at most `workers`
+    browsers run at once (none when every playlist is served over HTTP). URLs
+    naming the same playlist (e.g. differing only in ?si=) are scraped once. A
+    failing URL is recorded in the manifest and the batch carries on.
+
+    :param urls: Playlist URLs; later duplicates by canonical URL are dropped
+    :param output_dir: Directory receiving the playlist files and manifest.json
+    :param workers: Number of playlists scraped at the same time
+    :param fmt: Output format, one of EXPORT_FORMATS
+    :param headless: Run Chrome in background (default True)
+    :param engine: Scraper engine ("auto", "http" or "browser")
+    :param metadata_cache: Optional MetadataCache shared by every scrape in the batch
+    :param checkpoint_store: Optional CheckpointStore, so re-running a batch resumes unfinished playlists
+    :param on_result: Optional callable(result, done, total) called as each URL finishes
+    :return: The manifest dict (also written to output_dir/manifest.json)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Variants of one playlist would write the same output file at the same time
+    unique = {}
+    for url in urls:
+        unique.setdefault(canonical_url(url), url)
+    urls = list(unique.values())
+
+    workers = max(1, int(workers))
+    # Not the shared process pool, which keeps the size it was first created with
+    pool = DriverPool(size=workers, headless=headless)
+    started_at = time.time()
+    results = {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+            futures = {
+                executor.submit(_scrape_one, url, output_dir, fmt, headless, engine, pool, metadata_cache,
+                                checkpoint_store): url
+                for url in urls
+            }
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result["url"]] = result
+                    if on_result:
+                        on_result(result, len(results), len(urls))
+            except KeyboardInterrupt:
+                executor.shutdown(wait=True, cancel_futures=True)
+                print("Batch interrupted, writing partial manifest...")
+    finally:
+        pool.close()
+
+    manifest = _build_manifest(urls, results, started_at, workers, fmt, engine)
+    _write_json(os.path.join(output_dir, MANIFEST_NAME), manifest)
+    return manifest
+
+
+# ---------------------------------------------------------
+# INTERNAL / HELPER FUNCTIONS
+# ---------------------------------------------------------
+
+def _scrape_one(url, output_dir, fmt, headless, engine, pool, metadata_cache, checkpoint_store):
+    started = time.monotonic()
+    result = {"url": url, "status": "failed", "file": None, "title": None, "tracks": 0,
+              "engine": None, "seconds": None, "error": None}
+    try:
+        scraper = SpotifyPlaylistScraper(url, headless=headless, driver_pool=pool,
+                                         engine=engine, metadata_cache=metadata_cache,
+                                         checkpoint_store=checkpoint_store)
+        data = scraper.scrape()
+        result["engine"] = scraper.engine_used
+        if not data:
+            result["error"] = "Could not scrape playlist data"
+        else:
+            filename = output_name(url, fmt)
+            path = os.path.join(output_dir, filename)
+            with open(path + ".part", "w", encoding="utf-8") as f:
+                for chunk in iter_export(data["playlist_info"], data["tracks"], fmt):
+                    f.write(chunk)
+            os.replace(path + ".part", path)
+            result.update(status="done", file=filename, title=data["playlist_info"]["title"],
+                          tracks=len(data["tracks"]))
+    except Exception as e:
+        result["error"] = f"Scraping failed: {str(e)}"
+    result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def _build_manifest(urls, results, started_at, workers, fmt, engine):
+    elapsed = time.time() - started_at
+    entries = [results.get(url) or {"url": url, "status": "cancelled", "file": None, "title": None,
+                                    "tracks": 0, "engine": None, "seconds": None, "error": None}
+               for url in urls]
+    done = [r for r in entries if r["status"] == "done"]
+    total_tracks = sum(r["tracks"] for r in done)
+    return {
+        "started_at": started_at,
+        "finished_at": started_at + elapsed,
+        "elapsed_seconds": round(elapsed, 3),
+        "workers": workers,
+        "format": fmt,
+        "engine": engine,
+        "counts": {
+            "total": len(entries),
+            "done": len(done),
+            "failed": sum(1 for r in entries if r["status"] == "failed"),
+            "cancelled": sum(1 for r in entries if r["status"] == "cancelled"),
+            "tracks": total_tracks,
+        },
+        "throughput": {
+            "playlists_per_min": round(len(done) / elapsed * 60, 2) if elapsed > 0 else None,
+            "tracks_per_sec": round(total_tracks / elapsed, 2) if elapsed > 0 else None,
+        },
+        "results": entries,
+    }
+
+
+def _write_json(path, data):
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".part", path)
+
+
+def _print_result(result, done, total):
+    if result["status"] == "done":
+        print(f"[{done}/{total}] OK   {result['url']} -> {result['file']} "
+              f"({result['tracks']} tracks, {result['engine']}, {result['seconds']}s)")
+    else:
+        print(f"[{done}/{total}] FAIL {result['url']}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape many Spotify playlists in parallel.")
+    parser.add_argument("url_file", help="Text file with one playlist URL per line")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="Directory for playlist files and manifest.json")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Playlists scraped at the same time (and max browsers)")
+    parser.add_argument("-f", "--format", default="json", choices=sorted(EXPORT_FORMATS), help="Output format per playlist")
+    parser.add_argument("--engine", default="auto", choices=["auto", "http", "browser"], help="Scraper engine")
+    parser.add_argument("--show-browser", action="store_true", help="Run Chrome with a visible window")
+    parser.add_argument("--checkpoints", metavar="PATH", help="SQLite file for row checkpoints; re-runs resume unfinished playlists")
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args.url_file)
+    if not urls:
+        print(f"No URLs found in {args.url_file}")
+        return 1
+
+    checkpoint_store = None
+    if args.checkpoints:
+        checkpoint_store = CheckpointStore(args.checkpoints)
+        checkpoint_store.prune()
+
+    print(f"Scraping {len(urls)} playlists with {args.workers} workers into {args.output_dir}")
+    manifest = scrape_batch(urls, args.output_dir, workers=args.workers, fmt=args.format,
+                            headless=not args.show_browser, engine=args.engine,
+                            checkpoint_store=checkpoint_store, on_result=_print_result)
+
+    counts, throughput = manifest["counts"], manifest["throughput"]
+    print(f"\nDone in {manifest['elapsed_seconds']}s: {counts['done']} ok, {counts['failed']} failed, "
+          f"{counts['cancelled']} cancelled, {counts['tracks']} tracks")
+    print(f"Throughput: {throughput['playlists_per_min']} playlists/min, {throughput['tracks_per_sec']} tracks/s")
+    print(f"Manifest: {os.path.join(args.output_dir, MANIFEST_NAME)}")
+    return 0 if counts["failed"] == 0 and counts["cancelled"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
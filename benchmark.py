@@ -0,0 +1,383 @@
+import gc
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import platform
+import statistics
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_OUTPUT = "bench_results.json"
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------------------------------------------------
+# SYNTHETIC PAGES
+# ---------------------------------------------------------
+
+def synthetic_tracks(count):
+    """Deterministic Spotify-like tracks with repeating artists/albums."""
+    return [
+        {
+            "title": f"Track {i} - Synthetic Song Title",
+            "artists": [f"Artist {i % 97}"] + ([f"Featured {i % 13}"] if i % 5 == 0 else []),
+            "album": f"Album {i % 211}",
+            "duration_ms": 90000 + (i * 7919) % 240000,
+            "image_url": f"https://i.scdn.co/image/ab67616d00004851{i:024x}",
+        }
+        for i in range(count)
+    ]
+
+
+def og_meta_html(title, description, image_url):
+    return (
+        '<html><head>'
+        f'<meta property="og:title" content="{escape(title)}">'
+        f'<meta property="og:description" content="{escape(description)}">'
+        f'<meta property="og:image" content="{escape(image_url)}">'
+        '<title>Spotify</title></head><body><div id="main"></div></body></html>'
+    )
+
+
+def playlist_html(count):
+    """
+    Playlist page with `count` rendered tracklist rows (the markup the row
+    parsers look for) plus the same tracks as base64 initialState page data.
+    """
+    tracks = synthetic_tracks(count)
+    rows = []
+    for i, t in enumerate(tracks, 1):
+        minutes, seconds = divmod(t["duration_ms"] // 1000, 60)
+        artists = "".join(f'<a href="/artist/{escape(a)}">{escape(a)}</a>, ' for a in t["artists"])
+        rows.append(
+            f'<div role="row" aria-rowindex="{i}"><div data-testid="tracklist-row" class="row">'
+            f'<div class="index"><span>{i}</span></div>'
+            f'<div class="main"><img src="{t["image_url"]}" width="40" height="40">'
+            f'<div><div dir="auto">{escape(t["title"])}</div><span>{artists}</span></div></div>'
+            f'<div class="album"><a href="/album/{i % 211}">{escape(t["album"])}</a></div>'
+            f'<div class="added"><span>Jan 1, 2024</span></div>'
+            f'<div class="duration"><div>{minutes}:{seconds:02d}</div></div>'
+            '</div></div>'
+        )
+
+    state = {"entities": {"items": {"spotify:playlist:bench": {"content": {"totalCount": count, "items": [
+        {"itemV2": {"data": {
+            "name": t["title"],
+            "artists": {"items": [{"profile": {"name": a}} for a in t["artists"]]},
+            "albumOfTrack": {"name": t["album"], "coverArt": {"sources": [{"url": t["image_url"]}]}},
+            "trackDuration": {"totalMilliseconds": t["duration_ms"]},
+        }}} for t in tracks
+    ]}}}}}
+    initial_state = base64.b64encode(json.dumps(state).encode("utf-8")).decode("ascii")
+
+    head = og_meta_html(f"Benchmark {count}", f"Playlist · Bench · {count:,} items",
+                        "https://i.scdn.co/image/bench").split("<body>")[0]
+    return (
+        f'{head}<body><div role="grid" aria-rowcount="{count + 1}">{"".join(rows)}</div>'
+        f'<script id="initialState" type="text/plain">{initial_state}</script></body></html>'
+    )
+
+
+class BenchmarkServer:
+    """Serves pre-generated pages from memory on a local port."""
+
+    def __init__(self, pages):
+        """
+        :param pages: {path: html}
+        """
+        encoded = {path: html.encode("utf-8") for path, html in pages.items()}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = encoded.get(self.path.split("?")[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Head-only readers hang up once they have what they need
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------------------------------------
+# MEASUREMENT
+# ---------------------------------------------------------
+
+def measure(name, func, repeat=5, size=None, items=None):
+    """
+    Runs `func` once untimed, then `repeat` timed runs, and one extra run under
+    tracemalloc for peak Python memory (kept separate so tracing does not skew timings).
+    :param items: Work units per run (rows, tracks, ...), for a throughput figure
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "size": size,
+        "repeat": repeat,
+        "seconds": {
+            "min": round(min(timings), 6),
+            "median": round(median, 6),
+            "mean": round(statistics.mean(timings), 6),
+            "max": round(max(timings), 6),
+        },
+        "items_per_second": round(items / median, 1) if items and median > 0 else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def failed(name, error, size=None):
+    """Result entry for a benchmark that could not run, so the rest of the suite still does."""
+    message = str(error)
+    if isinstance(error, subprocess.CalledProcessError) and error.stderr:
+        message = error.stderr.strip().splitlines()[-1]
+    return {"name": name, "size": size, "error": message}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, browser=False, only=None):
+    """
+    Runs every benchmark against pages served from a local HTTP server.
+    :param only: Optional set of benchmark names to run
+    :return: List of result dicts (see measure() and failed())
+    """
+    from spotify_playlist_scraper import SpotifyPlaylistScraper
+    from http_tracks import extract_tracks, fetch_tracks_http
+
+    pages = {f"/playlist/bench{n}": playlist_html(n) for n in sizes}
+    pages["/track/bench"] = og_meta_html("Benchmark Track", "Song · Bench · 2024", "https://i.scdn.co/image/track")
+    wanted = (lambda name: not only or name in only)
+    results = []
+
+    if wanted("import_app"):
+        # Worker startup: a fresh interpreter importing app and building a web-only app,
+        # with its database and caches in a scratch directory rather than instance/
+        with tempfile.TemporaryDirectory(prefix="bench-") as scratch:
+            config = {
+                "APP_ROLE": "web",
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(scratch, "database.db"),
+                "METADATA_CACHE_PATH": os.path.join(scratch, "metadata_cache.db"),
+                "YOUTUBE_CACHE_PATH": os.path.join(scratch, "youtube_cache.db"),
+                "SCRAPE_CHECKPOINT_PATH": os.path.join(scratch, "scrape_checkpoints.db"),
+            }
+            code = f"import app; app.create_app({config!r})"
+            run = (lambda: subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, check=True,
+                                          capture_output=True, text=True))
+            try:
+                results.append(measure("import_app", run, max(1, repeat // 2)))
+            except (OSError, subprocess.SubprocessError) as e:
+                results.append(failed("import_app", e))
+
+    with BenchmarkServer(pages) as server:
+        if wanted("scrape_spotify"):
+            # Imported lazily: importing app pulls in Flask and SQLAlchemy
+            from app import scrape_spotify
+            url = server.base_url + "/track/bench"
+            results.append(measure("scrape_spotify", lambda: scrape_spotify(url), repeat))
+
+        for n in sizes:
+            url = f"{server.base_url}/playlist/bench{n}"
+            html = pages[f"/playlist/bench{n}"]
+            reps = max(1, repeat if n < 10000 else repeat // 2)
+
+            if wanted("parse_rows_soup"):
+                results.append(measure("parse_rows_soup", lambda: SpotifyPlaylistScraper._parse_rows_soup(html),
+                                       reps, size=n, items=n))
+            if wanted("extract_tracks"):
+                results.append(measure("extract_tracks", lambda: extract_tracks(html), reps, size=n, items=n))
+            if wanted("fetch_metadata"):
+                scraper = SpotifyPlaylistScraper(url)
+                results.append(measure("fetch_metadata", scraper._fetch_metadata, reps, size=n))
+            if wanted("fetch_metadata_head"):
+                # Browser engine: only the page head is streamed
+                scraper = SpotifyPlaylistScraper(url, engine="browser")
+                results.append(measure("fetch_metadata_head", scraper._fetch_metadata, reps, size=n))
+            if wanted("fetch_tracks_http"):
+                results.append(measure("fetch_tracks_http", lambda: fetch_tracks_http(url, html=html),
+                                       reps, size=n, items=n))
+            if wanted("scrape_http"):
+                results.append(measure("scrape_http", lambda: SpotifyPlaylistScraper(url, engine="http").scrape(),
+                                       reps, size=n, items=n))
+            if browser and wanted("scrape_browser"):
+                # Every row is rendered up front, so this measures extraction, not Spotify's lazy loading
+                results.append(measure("scrape_browser",
+                                       lambda: SpotifyPlaylistScraper(url, engine="browser", stall_timeout=2).scrape(),
+                                       1, size=n, items=n))
+
+    return results
+
+
+def compare(results, baseline, threshold=0.10):
+    """
+    Compares median timings with a baseline results document.
+    :return: List of (name, size, baseline median, current median, change) slower than `threshold`
+    """
+    previous = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["name"], r["size"]))
+        if not old or "error" in r or "error" in old:
+            continue
+        before, after = old["seconds"]["median"], r["seconds"]["median"]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append((r["name"], r["size"], before, after, (after - before) / before))
+    return regressions
+
+
+def compare_block_profile(urls, repeat=3):
+    """
+    Scrapes live playlists in Chrome with the request-blocking profile on and off,
+    measuring bytes downloaded (from Chrome's network log) and time to complete.
+    :return: List of {"url", "profile", "runs": [...], "median_seconds", "median_bytes"}
+    """
+    from driver_pool import DriverPool
+    from spotify_playlist_scraper import SpotifyPlaylistScraper
+
+    report = []
+    for profile, block in (("blocking", True), ("full", False)):
+        pool = DriverPool(size=1, block_resources=block, measure_network=True)
+        try:
+            for url in urls:
+                runs = []
+                for _ in range(repeat):
+                    scraper = SpotifyPlaylistScraper(url, engine="browser", driver_pool=pool)
+                    start = time.perf_counter()
+                    data = scraper.scrape()
+                    network = (scraper.scroll_stats or {}).get("network") or {}
+                    runs.append({
+                        "seconds": round(time.perf_counter() - start, 3),
+                        "bytes": network.get("bytes"),
+                        "requests": network.get("requests"),
+                        "blocked": network.get("blocked"),
+                        "tracks": len(data["tracks"]) if data else 0,
+                    })
+                byte_counts = [r["bytes"] for r in runs if r["bytes"] is not None]
+                report.append({
+                    "url": url,
+                    "profile": profile,
+                    "runs": runs,
+                    "median_seconds": statistics.median(r["seconds"] for r in runs),
+                    "median_bytes": statistics.median(byte_counts) if byte_counts else None,
+                })
+        finally:
+            pool.close()
+    return report
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    try:
+        info["git_commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                            text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        info["git_commit"] = None
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the parsing and scraping hot paths.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated playlist sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--browser", action="store_true", help="Also run full Selenium scrapes (needs Chrome)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed median slowdown vs baseline (0.10 = 10%%)")
+    parser.add_argument("--block-profile", nargs="+", metavar="URL",
+                        help="Instead of the offline suite, compare live browser scrapes with request blocking on/off")
+    args = parser.parse_args(argv)
+
+    if args.block_profile:
+        report = compare_block_profile(args.block_profile, repeat=args.repeat)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "block_profile": report}, f, indent=2)
+        print(f"{'profile':<10}{'median s':>10}{'median MB':>11}{'tracks':>8}  url")
+        for r in report:
+            mb = f"{r['median_bytes'] / 1048576:.2f}" if r["median_bytes"] is not None else "-"
+            print(f"{r['profile']:<10}{r['median_seconds']:>10.2f}{mb:>11}{r['runs'][-1]['tracks']:>8}  {r['url']}")
+        print(f"Results written to {args.output}")
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(args.only.split(",")) if args.only else None
+    results = run_benchmarks(sizes, repeat=args.repeat, browser=args.browser, only=only)
+
+    document = {"environment": environment(), "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+    print(f"{'benchmark':<20}{'size':>8}{'median s':>12}{'items/s':>14}{'peak MB':>10}")
+    failures = [r for r in results if "error" in r]
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<20}{r['size'] or '-':>8}  FAILED: {r['error']}")
+            continue
+        rate = f"{r['items_per_second']:,.0f}" if r["items_per_second"] else "-"
+        print(f"{r['name']:<20}{r['size'] or '-':>8}{r['seconds']['median']:>12.4f}{rate:>14}"
+              f"{r['peak_memory_bytes'] / 1048576:>10.1f}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, size, before, after, change in regressions:
+            print(f"REGRESSION {name} (size {size}): {before:.4f}s -> {after:.4f}s (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.compare}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
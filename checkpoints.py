@@ -0,0 +1,98 @@
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+from metadata_cache import canonical_url
+from tracks import Track
+
+
+class CheckpointStore:
+    """
+    Rows collected by in-progress browser scrapes, in a SQLite file keyed by
+    (canonical playlist URL, row position), so a crashed or stalled scrape
+    can resume from where it stopped instead of starting over.
+    """
+
+    def __init__(self, path, max_age=24 * 3600):
+        """
+        :param path: SQLite file (shared by every worker process on the host)
+        :param max_age: Seconds after which a checkpoint is ignored and removed
+        """
+        self.path = path
+        self.max_age = max_age
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scrape_checkpoint ("
+                "url TEXT PRIMARY KEY, expected INTEGER, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scrape_checkpoint_row ("
+                "url TEXT NOT NULL, position INTEGER NOT NULL, title TEXT NOT NULL, artist TEXT NOT NULL, "
+                "album TEXT NOT NULL, duration_seconds INTEGER, image_url TEXT NOT NULL, "
+                "PRIMARY KEY (url, position))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Connection for one `with` block: committed (or rolled back) and closed at its end."""
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def save(self, url, rows, expected=None):
+        """
+        Adds rows to the checkpoint of `url`.
+        :param rows: Iterable of (position, Track); rows without a position are skipped
+        :param expected: Declared track count, used to spot stale checkpoints
+        """
+        key = canonical_url(url)
+        values = [(key, position, t.title, t.artist, t.album, t.duration_seconds, t.image_url)
+                  for position, t in rows if position is not None]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scrape_checkpoint (url, expected, updated_at) VALUES (?, ?, ?)",
+                (key, expected, time.time())
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO scrape_checkpoint_row "
+                "(url, position, title, artist, album, duration_seconds, image_url) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                values
+            )
+
+    def load(self, url, expected=None):
+        """
+        Returns {position: Track} saved for `url`, or {} when there is no usable
+        checkpoint (none, expired, or saved for a different declared track count).
+        """
+        key = canonical_url(url)
+        with self._connect() as conn:
+            row = conn.execute("SELECT expected, updated_at FROM scrape_checkpoint WHERE url = ?", (key,)).fetchone()
+            if row is None:
+                return {}
+            saved_expected, updated_at = row
+            if time.time() - updated_at > self.max_age or (expected and saved_expected and saved_expected != expected):
+                self._delete(conn, key)
+                return {}
+            rows = conn.execute(
+                "SELECT position, title, artist, album, duration_seconds, image_url "
+                "FROM scrape_checkpoint_row WHERE url = ? ORDER BY position", (key,)
+            ).fetchall()
+        return {position: Track(title, artist, album, duration_seconds, image_url)
+                for position, title, artist, album, duration_seconds, image_url in rows}
+
+    def clear(self, url):
+        with self._connect() as conn:
+            self._delete(conn, canonical_url(url))
+
+    def prune(self):
+        """Removes expired checkpoints. Returns how many were removed."""
+        cutoff = time.time() - self.max_age
+        with self._connect() as conn:
+            keys = [k for (k,) in conn.execute("SELECT url FROM scrape_checkpoint WHERE updated_at < ?", (cutoff,))]
+            for key in keys:
+                self._delete(conn, key)
+        return len(keys)
+
+    @staticmethod
+    def _delete(conn, key):
+        conn.execute("DELETE FROM scrape_checkpoint_row WHERE url = ?", (key,))
+        conn.execute("DELETE FROM scrape_checkpoint WHERE url = ?", (key,))
@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+# selenium and webdriver_manager are imported where browsers are built, so
+# importing this module (and creating a pool) stays cheap until the first scrape
+
+# Requests dropped by the blocking profile (Network.setBlockedURLs patterns).
+# Only text and <img src> attributes are read, so images, fonts and media are
+# never needed; the tracker hosts are third parties the web player can do without.
+BLOCKED_URL_PATTERNS = (
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp3", "*.mp4", "*.m4a", "*.m4s", "*.webm", "*.ogg",
+    "*://i.scdn.co/*", "*://mosaic.scdn.co/*", "*://image-cdn-*.spotifycdn.com/*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*",
+    "*sentry.io*", "*scorecardresearch.com*", "*branch.io*", "*onetrust.com*", "*cookielaw.org*",
+)
+
+
+class DriverPool:
+    """
+    Process-wide pool of reusable headless Chrome drivers.
+
+    Drivers are created lazily up to `size`, handed out with checkout() and
+    returned with checkin(). A returned driver is cleaned (cookies, storage,
+    extra windows) and health-checked; it is recycled once it has served
+    `max_uses` scrapes or its browser RSS grows past `max_rss_mb`.
+
+    With `block_resources` on, every browser drops images, fonts, media and
+    known tracker hosts (Chrome content settings plus CDP Network.setBlockedURLs).
+    """
+
+    _driver_path = None
+    _driver_path_lock = threading.Lock()
+
+    def __init__(self, size=2, headless=True, max_uses=25, max_rss_mb=1024, checkout_timeout=300,
+                 block_resources=True, blocked_urls=BLOCKED_URL_PATTERNS, measure_network=False):
+        """
+        :param size: Maximum number of live Chrome instances
+        :param headless: Run Chrome in background (default True)
+        :param max_uses: Recycle a driver after this many checkouts
+        :param max_rss_mb: Recycle a driver when its process tree exceeds this RSS (MB)
+        :param checkout_timeout: Seconds to wait for a free driver before giving up
+        :param block_resources: Use the request-blocking profile
+        :param blocked_urls: URL patterns blocked by the profile (* wildcards)
+        :param measure_network: Record Chrome's network log so network_usage() can report bytes
+        """
+        self.size = max(1, int(size))
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.checkout_timeout = checkout_timeout
+        self.block_resources = block_resources
+        self.blocked_urls = list(blocked_urls)
+        self.measure_network = measure_network
+
+        self._idle = []          # Drivers ready to be checked out
+        self._uses = {}          # driver -> number of checkouts served (guarded by _cond)
+        self._live = 0           # Drivers created and not yet quit
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # ---------------------------------------------------------
+    # PUBLIC METHODS
+    # ---------------------------------------------------------
+
+    def checkout(self, timeout=None, on_phase=None):
+        """
+        Returns a ready driver, launching a new one if the pool has room.
+        :param on_phase: Optional callable(name, seconds) told how long was spent in
+                         "driver_wait", and for a new browser "driver_install" / "driver_launch"
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    driver = self._idle.pop()
+                    self._uses[driver] = self._uses.get(driver, 0) + 1
+                    break
+                if self._live < self.size:
+                    # Reserve the slot now, launch outside the lock
+                    self._live += 1
+                    driver = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a free browser")
+                self._cond.wait(remaining)
+
+        if on_phase:
+            on_phase("driver_wait", time.monotonic() - start)
+
+        if driver is None:
+            try:
+                driver = self._create_driver(on_phase)
+            except Exception:
+                with self._cond:
+                    self._live -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._uses[driver] = 1
+
+        return driver
+
+    def checkin(self, driver, discard=False):
+        """Returns a driver to the pool, or quits it if it should be recycled."""
+        if not discard:
+            discard = not self._reset(driver) or self._should_recycle(driver)
+
+        if discard:
+            self._quit(driver)
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            if self._closed:
+                self._live -= 1
+                closed = True
+            else:
+                self._idle.append(driver)
+                closed = False
+            self._cond.notify()
+        if closed:
+            self._quit(driver)
+
+    @contextmanager
+    def driver(self, timeout=None, on_phase=None):
+        """Context manager around checkout()/checkin()."""
+        driver = self.checkout(timeout, on_phase)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not self._is_healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, discard=broken)
+
+    def network_usage(self, driver):
+        """
+        Network traffic since the previous call for this driver, read from Chrome's
+        performance log: {"bytes", "requests", "blocked"}. None unless measure_network is on.
+        """
+        if not self.measure_network:
+            return None
+        usage = {"bytes": 0, "requests": 0, "blocked": 0}
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            if method == "Network.loadingFinished":
+                usage["bytes"] += int(message["params"].get("encodedDataLength", 0))
+                usage["requests"] += 1
+            elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+                usage["blocked"] += 1
+        return usage
+
+    def close(self):
+        """Quits every idle driver; drivers in use are quit on checkin."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for driver in idle:
+            self._quit(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "live": self._live,
+                "idle": len(self._idle),
+                "in_use": self._live - len(self._idle),
+            }
+
+    # ---------------------------------------------------------
+    # INTERNAL / HELPER METHODS
+    # ---------------------------------------------------------
+
+    @classmethod
+    def resolve_driver_path(cls):
+        """Resolves the chromedriver binary once per process."""
+        if cls._driver_path is None:
+            with cls._driver_path_lock:
+                if cls._driver_path is None:
+                    cls._driver_path = os.environ.get("CHROMEDRIVER_PATH")
+                    if not cls._driver_path:
+                        from webdriver_manager.chrome import ChromeDriverManager
+                        cls._driver_path = ChromeDriverManager().install()
+        return cls._driver_path
+
+    def _build_options(self):
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument("--headless=new")
+
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument("--log-level=3")
+
+        if self.block_resources:
+            # Images stay in the DOM with their src attributes, they just never download
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.media_stream": 2,
+            })
+            options.add_argument("--autoplay-policy=user-gesture-required")
+            options.add_argument("--mute-audio")
+        if self.measure_network:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return options
+
+    def _create_driver(self, on_phase=None):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        start = time.monotonic()
+        driver_path = self.resolve_driver_path()
+        installed = time.monotonic()
+        driver = webdriver.Chrome(service=Service(driver_path), options=self._build_options())
+        if self.block_resources:
+            self._install_blocking(driver)
+        if on_phase:
+            on_phase("driver_install", installed - start)
+            on_phase("driver_launch", time.monotonic() - installed)
+        return driver
+
+    def _install_blocking(self, driver):
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+        except Exception as e:
+            print(f"Request blocking unavailable: {e}")
+
+    def _reset(self, driver):
+        """Cleans browser state between scrapes. Returns False if the driver is unusable."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            driver.get("about:blank")
+            return self._is_healthy(driver)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _should_recycle(self, driver):
+        with self._cond:
+            uses = self._uses.get(driver, 0)
+        if self.max_uses and uses >= self.max_uses:
+            return True
+        if self.max_rss_mb:
+            rss = self._rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                return True
+        return False
+
+    @staticmethod
+    def _rss_mb(driver):
+        """RSS of chromedriver plus its browser processes, read from /proc (Linux only)."""
+        try:
+            root = driver.service.process.pid
+        except Exception:
+            return None
+        if not os.path.isdir("/proc"):
+            return None
+
+        total_kb = 0
+        stack = [root]
+        seen = set()
+        while stack:
+            pid = stack.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+                with open(f"/proc/{pid}/task/{pid}/children") as f:
+                    stack.extend(int(p) for p in f.read().split())
+            except (OSError, ValueError):
+                continue
+        return total_kb / 1024
+
+    def _quit(self, driver):
+        with self._cond:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE POOLS
+# ---------------------------------------------------------
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(headless=True, **kwargs):
+    """
+    Returns the shared pool for this process, creating it on first use.
+    Keyword arguments (size, max_uses, ...) only apply on creation.
+    """
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None:
+            pool = DriverPool(headless=headless, **kwargs)
+            _pools[headless] = pool
+        return pool
+
+
+@atexit.register
+def close_driver_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,73 @@
+import io
+import re
+import csv
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+CSV_COLUMNS = [("Track Number", "index"), ("Title", "title"), ("Artist", "artist"),
+               ("Album", "album"), ("Duration", "duration")]
+
+
+def iter_export(playlist_info, tracks, fmt):
+    """
+    Serializes a playlist chunk by chunk. `tracks` may be any iterable
+    (e.g. a database cursor), so memory stays flat regardless of size.
+    """
+    if fmt == "json":
+        return iter_json(playlist_info, tracks)
+    if fmt == "ndjson":
+        return iter_ndjson(playlist_info, tracks)
+    if fmt == "csv":
+        return iter_csv(tracks)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def iter_json(playlist_info, tracks):
+    """Same document as scrape() returns: {"playlist_info": {...}, "tracks": [...]}"""
+    yield '{"playlist_info": ' + json.dumps(playlist_info, ensure_ascii=False) + ', "tracks": ['
+    first = True
+    for track in tracks:
+        yield ('\n' if first else ',\n') + json.dumps(track, ensure_ascii=False)
+        first = False
+    yield '\n]}\n'
+
+
+def iter_ndjson(playlist_info, tracks):
+    """First line is the playlist_info, then one track per line."""
+    yield json.dumps({"playlist_info": playlist_info}, ensure_ascii=False) + '\n'
+    for track in tracks:
+        yield json.dumps(track, ensure_ascii=False) + '\n'
+
+
+def iter_csv(tracks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in CSV_COLUMNS])
+    for track in tracks:
+        writer.writerow([track.get(key, "") for _, key in CSV_COLUMNS])
+        if buffer.tell() > 16384:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compresses a stream of str/bytes chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(title, fmt, compressed=False):
+    slug = re.sub(r'[^a-z0-9]+', '_', (title or 'playlist').lower()).strip('_') or 'playlist'
+    return f"{slug}_playlist.{EXPORT_FORMATS[fmt][1]}" + (".gz" if compressed else "")
@@ -0,0 +1,111 @@
+import os
+import random
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import REGISTRY
+from rate_limit import HostRateLimiter, RateLimitExceeded, parse_limits, parse_rate
+
+DEFAULT_TIMEOUT = (
+    float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('HTTP_READ_TIMEOUT', 15))
+)
+DEFAULT_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+DEFAULT_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))
+MAX_RETRY_AFTER = float(os.environ.get('HTTP_MAX_RETRY_AFTER', 30))
+# Per-host token buckets, "host=rate[/burst],..." (requests per second)
+RATE_LIMITS = parse_limits(os.environ.get('HTTP_RATE_LIMITS', 'open.spotify.com=5/10,www.youtube.com=5/10'))
+DEFAULT_RATE_LIMIT = parse_rate(os.environ['HTTP_RATE_DEFAULT']) if os.environ.get('HTTP_RATE_DEFAULT') else None  # Other hosts
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('HTTP_RATE_MAX_WAIT', 10))
+
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "spotscrape_upstream_errors_total",
+    "Outbound requests that failed after retries, by host and reason (status code or exception)",
+    ("host", "reason")
+)
+
+
+class JitteredRetry(Retry):
+    """
+    Retry with "full jitter" exponential backoff, and a cap on how long a
+    Retry-After header may make us wait.
+    """
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+class HttpClient(requests.Session):
+    """
+    requests.Session with per-host connection pooling, keep-alive, default
+    connect/read timeouts, retries on 429/5xx honouring Retry-After and
+    optional per-host rate limits.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, pool_size=DEFAULT_POOL_SIZE,
+                 rate_limiter=None):
+        """
+        :param timeout: (connect, read) seconds used when a call passes no timeout
+        :param retries: Retries for connection errors and 429/500/502/503/504 responses
+        :param pool_size: Keep-alive connections kept per host
+        :param rate_limiter: Optional HostRateLimiter every request waits on before it is sent
+        """
+        super().__init__()
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        retry = JitteredRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        host = urlsplit(url).hostname or "unknown"
+        try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(host)
+            response = super().request(method, url, **kwargs)
+        except RateLimitExceeded:
+            raise
+        except requests.RequestException as e:
+            UPSTREAM_ERRORS.inc(host=host, reason=type(e).__name__)
+            raise
+        if response.status_code == 429 or response.status_code >= 500:
+            UPSTREAM_ERRORS.inc(host=host, reason=str(response.status_code))
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Returns the HttpClient shared by every outbound fetch in this process."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(rate_limiter=HostRateLimiter(
+                    RATE_LIMITS, default=DEFAULT_RATE_LIMIT, max_wait=RATE_LIMIT_MAX_WAIT
+                ))
+    return _client
@@ -0,0 +1,192 @@
+import re
+import json
+import base64
+from urllib.parse import urljoin, urlsplit
+from http_client import get_http_client
+from tracks import Track
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+
+# <script id="initialState" type="text/plain">BASE64</script> and Next.js page data
+INITIAL_STATE_RE = re.compile(r'<script[^>]*id="initialState"[^>]*>\s*([A-Za-z0-9+/=_-]+)\s*</script>', re.S)
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+JSON_SCRIPT_RE = re.compile(r'<script[^>]*type="application/(?:ld\+)?json"[^>]*>(.*?)</script>', re.S)
+
+
+def fetch_tracks_http(url, html=None, session=None, timeout=10, max_pages=50):
+    """
+    Extracts a playlist's tracks without a browser.
+
+    Reads the page data embedded in the server-rendered HTML (fetching `url`
+    unless `html` is given), then the /embed/ variant of the page if the first
+    one has no track list. Paged track lists ("next" links) are followed up to
+    `max_pages` pages. Works against any host, so saved pages can be served
+    from a local HTTP server.
+
+    :return: List of Track objects (title, artist, album, duration, image_url, index),
+             or None if no track list was found
+    """
+    http = session or get_http_client()
+    candidates = [url, embed_url(url)]
+
+    for i, page_url in enumerate(candidates):
+        if not page_url:
+            continue
+        try:
+            if i > 0 or html is None:
+                response = http.get(page_url, headers=HEADERS, timeout=timeout)
+                if response.status_code != 200:
+                    continue
+                page_html = response.text
+            else:
+                page_html = html
+
+            tracks, next_url = extract_tracks(page_html)
+            if not tracks:
+                continue
+
+            pages = 1
+            while next_url and pages < max_pages:
+                response = http.get(urljoin(page_url, next_url), headers=HEADERS, timeout=timeout)
+                if response.status_code != 200:
+                    break
+                more, next_url = _tracks_from_data(response.json())
+                if not more:
+                    break
+                tracks.extend(more)
+                pages += 1
+
+            for index, track in enumerate(tracks, 1):
+                track.index = index
+            return tracks
+        except Exception as e:
+            print(f"HTTP track extraction error ({page_url}): {e}")
+
+    return None
+
+
+def embed_url(url):
+    """https://open.spotify.com/playlist/ID?si=.. -> https://open.spotify.com/embed/playlist/ID"""
+    parts = urlsplit(url)
+    match = re.search(r'/playlist/([A-Za-z0-9]+)', parts.path)
+    if not match or '/embed/' in parts.path:
+        return None
+    return f"{parts.scheme}://{parts.netloc}/embed/playlist/{match.group(1)}"
+
+
+def extract_tracks(html):
+    """
+    Finds the longest track list in the JSON blobs embedded in `html`.
+    :return: (tracks, next_page_url)
+    """
+    best, best_next = [], None
+    for data in _embedded_json(html):
+        tracks, next_url = _tracks_from_data(data)
+        if len(tracks) > len(best):
+            best, best_next = tracks, next_url
+    return best, best_next
+
+
+# ---------------------------------------------------------
+# INTERNAL / HELPER FUNCTIONS
+# ---------------------------------------------------------
+
+def _embedded_json(html):
+    for match in INITIAL_STATE_RE.finditer(html):
+        try:
+            raw = match.group(1)
+            yield json.loads(base64.urlsafe_b64decode(raw.replace('+', '-').replace('/', '_') + '=' * (-len(raw) % 4)))
+        except Exception:
+            continue
+
+    for regex in (NEXT_DATA_RE, JSON_SCRIPT_RE):
+        for match in regex.finditer(html):
+            try:
+                yield json.loads(match.group(1))
+            except Exception:
+                continue
+
+
+def _tracks_from_data(data):
+    """Walks a JSON document and returns (longest track list, its "next" page link)."""
+    best, best_next = [], None
+    stack = [(data, None)]
+
+    while stack:
+        node, parent = stack.pop()
+        if isinstance(node, dict):
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    stack.append((value, node))
+        elif isinstance(node, list) and node:
+            tracks = [t for t in map(_as_track, node) if t]
+            # Most elements must be tracks, otherwise this is some other list
+            if len(tracks) > len(best) and len(tracks) * 2 >= len(node):
+                best = tracks
+                best_next = parent.get("next") if isinstance(parent, dict) and isinstance(parent.get("next"), str) else None
+            for value in node:
+                if isinstance(value, (dict, list)):
+                    stack.append((value, None))
+
+    return best, best_next
+
+
+def _as_track(item):
+    """Normalizes the track shapes Spotify embeds (web API, GraphQL, embed) to a Track."""
+    if not isinstance(item, dict):
+        return None
+
+    # Unwrap {"track": {...}}, {"itemV2": {"data": {...}}}, {"item": {"data": {...}}}
+    for wrapper in ("track", "itemV2", "item"):
+        inner = item.get(wrapper)
+        if isinstance(inner, dict):
+            item = inner.get("data", inner) if isinstance(inner.get("data"), dict) else inner
+            break
+
+    title = item.get("name") or item.get("title")
+    if not isinstance(title, str):
+        return None
+
+    duration_ms = item.get("duration_ms")
+    if duration_ms is None:
+        duration = item.get("trackDuration") or item.get("duration")
+        if isinstance(duration, dict):
+            duration_ms = duration.get("totalMilliseconds")
+        elif isinstance(duration, (int, float)):
+            duration_ms = duration
+    if not isinstance(duration_ms, (int, float)):
+        return None
+
+    artists = item.get("artists")
+    if isinstance(artists, dict):
+        artists = artists.get("items")
+    names = []
+    for artist in artists or []:
+        if isinstance(artist, dict):
+            name = artist.get("name") or (artist.get("profile") or {}).get("name")
+            if name:
+                names.append(name)
+    if not names and isinstance(item.get("subtitle"), str):
+        names = [n.strip() for n in item["subtitle"].split(",") if n.strip()]
+
+    album = item.get("album") or item.get("albumOfTrack") or {}
+    album_name = album.get("name") if isinstance(album, dict) else None
+
+    image_url = ""
+    if isinstance(album, dict):
+        images = album.get("images") or (album.get("coverArt") or {}).get("sources") or []
+        if images and isinstance(images[-1], dict):
+            # Smallest image matches the thumbnail the web player shows
+            image_url = images[-1].get("url", "")
+    if not image_url:
+        images = item.get("images") or (item.get("coverArt") or {}).get("sources") or []
+        if images and isinstance(images[-1], dict):
+            image_url = images[-1].get("url", "")
+
+    return Track(
+        title=title.strip(),
+        artist=", ".join(dict.fromkeys(names)) if names else "Unknown Artist",
+        album=album_name.strip() if album_name else "Unknown Album",
+        duration_seconds=int(round(duration_ms / 1000)),
+        image_url=image_url
+    )
@@ -0,0 +1,249 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from urllib.parse import urlsplit
+
+# /intl-de/, /intl-pt-BR/ ... prefixes Spotify adds for localized pages
+LOCALE_PREFIX_RE = re.compile(r'^/intl-[a-z]{2}(?:[-_][a-z0-9]+)?(?=/)', re.IGNORECASE)
+
+
+def canonical_url(url):
+    """
+    Cache key for a Spotify link: lowercase host, no query string, fragment,
+    locale prefix or trailing slash.
+    e.g. https://open.spotify.com/intl-de/track/ID?si=abc -> https://open.spotify.com/track/ID
+    """
+    parts = urlsplit(url.strip())
+    path = LOCALE_PREFIX_RE.sub('', parts.path).rstrip('/')
+    scheme = (parts.scheme or 'https').lower()
+    return f"{scheme}://{parts.netloc.lower()}{path}"
+
+
+class MemoryStore:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._items = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._items[key] = (time.time() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteStore:
+    """LRU store in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_metadata_cache_last_access ON metadata_cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection for one `with` block: committed (or rolled back) and closed at its end."""
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM metadata_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM metadata_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE metadata_cache SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            conn.execute("DELETE FROM metadata_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM metadata_cache WHERE key IN ("
+                "SELECT key FROM metadata_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM metadata_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+
+
+# Returned by a revalidating fetch when upstream answered 304 Not Modified
+NOT_MODIFIED = object()
+
+
+class MetadataCache:
+    """
+    TTL/LRU cache for page metadata keyed by canonical URL.
+    Concurrent misses for the same key in this process share one upstream fetch.
+    """
+
+    def __init__(self, store=None, ttl=3600, revalidate_ttl=86400):
+        """
+        :param store: MemoryStore (default) or SQLiteStore
+        :param ttl: Seconds a fetched entry stays fresh
+        :param revalidate_ttl: Seconds a stale entry with validators (ETag / Last-Modified) is kept for revalidation
+        """
+        self.store = store if store is not None else MemoryStore()
+        self.ttl = ttl
+        self.revalidate_ttl = revalidate_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.revalidated = 0
+        self._inflight = {}  # key -> [threading.Event, result, exception]
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, url, fetch, namespace="page"):
+        """
+        Returns the cached value for `url`, calling `fetch()` on a miss.
+        Falsy results (failed fetches) are returned but not cached.
+        """
+        return self.get_or_fetch_key(f"{namespace}:{canonical_url(url)}", fetch)
+
+    def get_or_fetch_key(self, key, fetch):
+        """get_or_fetch() for keys that are not URLs (e.g. search queries)."""
+        value = self.store.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        def load():
+            value = fetch()
+            if value:
+                self.store.set(key, value, self.ttl)
+            return value
+
+        return self._single_flight(key, load)
+
+    def get_or_revalidate(self, url, fetch, namespace="page"):
+        """
+        get_or_fetch() for fetches that can make conditional HTTP requests.
+
+        Entries are stored with the upstream ETag / Last-Modified and kept for
+        `revalidate_ttl` seconds after they go stale. A stale entry is passed
+        back to `fetch` as validators; when upstream answers 304 the cached
+        value is fresh again without the page being downloaded.
+
+        :param fetch: Callable(validators dict) -> (value, validators), where value is
+                      NOT_MODIFIED when the cached copy is still current
+        """
+        key = f"{namespace}:{canonical_url(url)}"
+        entry = self.store.get(key)
+        if entry is not None and "fresh_until" not in entry:
+            entry = None  # Plain value written by get_or_fetch() before this key was revalidated
+        if entry is not None and entry["fresh_until"] > time.time():
+            with self._lock:
+                self.hits += 1
+            return entry["value"]
+
+        def load():
+            value, validators = fetch(entry["validators"] if entry else {})
+            if value is NOT_MODIFIED:
+                if entry is None:
+                    return None
+                value = entry["value"]
+                validators = validators or entry["validators"]
+                with self._lock:
+                    self.revalidated += 1
+            if value:
+                # Without validators a stale copy is of no use, so it expires with its freshness
+                keep = self.ttl + (self.revalidate_ttl if validators else 0)
+                self.store.set(key, {"value": value, "validators": validators or {},
+                                     "fresh_until": time.time() + self.ttl}, keep)
+            return value
+
+        return self._single_flight(key, load)
+
+    def invalidate(self, url, namespace="page"):
+        self.store.delete(f"{namespace}:{canonical_url(url)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self.store).__name__,
+                "entries": len(self.store),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "revalidated": self.revalidated,
+            }
+
+    def _single_flight(self, key, load):
+        """
+        Runs load() once for concurrent callers of the same key; the others wait for its
+        result. If load() raises, every waiting caller gets the same exception.
+        """
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                waiting = [threading.Event(), None, None]
+                self._inflight[key] = waiting
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            waiting[0].wait()
+            if waiting[2] is not None:
+                raise waiting[2]
+            return waiting[1]
+
+        try:
+            waiting[1] = load()
+            return waiting[1]
+        except BaseException as e:
+            waiting[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            waiting[0].set()
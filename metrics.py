@@ -0,0 +1,225 @@
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class PhaseTimer:
+    """
+    Collects wall-clock time per named phase of one scrape.
+    A phase may run several times (e.g. scroll steps); count and max are kept.
+    """
+
+    def __init__(self, on_phase=None):
+        """
+        :param on_phase: Optional callable(name, seconds) called every time a phase ends
+        """
+        self.on_phase = on_phase
+        self.started = time.monotonic()
+        self.phases = {}  # name -> {"seconds", "count", "max_seconds"}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - start)
+
+    def add(self, name, seconds):
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = {"seconds": 0.0, "count": 0, "max_seconds": 0.0}
+        entry["seconds"] += seconds
+        entry["count"] += 1
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        if self.on_phase:
+            try:
+                self.on_phase(name, seconds)
+            except Exception as e:
+                print(f"Phase callback error: {e}")
+
+    def report(self):
+        """{"total_seconds": ..., "phases": {name: {"seconds", "count", "max_seconds"}}}"""
+        phases = {
+            name: {"seconds": round(e["seconds"], 4), "count": e["count"], "max_seconds": round(e["max_seconds"], 4)}
+            for name, e in self.phases.items()
+        }
+        total = self.phases.get("total")
+        return {
+            "total_seconds": round(total["seconds"] if total else time.monotonic() - self.started, 4),
+            "phases": phases,
+        }
+
+
+# ---------------------------------------------------------
+# PROMETHEUS METRICS
+# ---------------------------------------------------------
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._labels_text(key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """For collectors mirroring a count that is kept elsewhere (e.g. cache hit counters)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, ([*counts], count, total)) for key, (counts, count, total) in self._values.items())
+        for key, (counts, count, total) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._labels_text(key, [('le', _number(bound))])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self._labels_text(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{self._labels_text(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels_text(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text format.
+    Collectors are callables run at render time to refresh values owned elsewhere
+    (cache hit counters, driver pool occupancy, ...).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+# Process-wide registry served at /metrics
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,109 @@
+import re
+from http_client import get_http_client
+
+OG_PROPERTIES = ("og:title", "og:description", "og:image")
+
+HEAD_END_RE = re.compile(rb'</head\s*>', re.I)
+
+
+def validator_headers(validators):
+    """If-None-Match / If-Modified-Since request headers for validators saved from an earlier response."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(response):
+    """{"etag", "last_modified"} of a response, for revalidating it later (empty when it has neither)."""
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+
+def fetch_head(url, headers=None, timeout=None, session=None, properties=OG_PROPERTIES,
+               chunk_size=8192, max_bytes=512 * 1024, validators=None):
+    """
+    Downloads only the start of a page: reads the response in chunks and stops
+    at the </head> boundary, or as soon as every wanted <meta property> tag has
+    been received, whichever comes first.
+
+    :param properties: Meta properties whose presence ends the download early
+    :param max_bytes: Hard cap on bytes read when neither boundary shows up
+    :param validators: Validators of a cached copy; makes the request conditional (304 when unchanged)
+    :return: (status_code, head_html or None, bytes_read, response validators)
+    """
+    http = session or get_http_client()
+    tag_res = [re.compile(rb'<meta\b[^>]*\bproperty=["\']' + re.escape(p.encode()) + rb'["\'][^>]*>', re.I)
+               for p in properties]
+    headers = dict(headers or {}, **validator_headers(validators))
+    response = http.get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        if response.status_code == 304:
+            return 304, None, 0, response_validators(response) or validators
+        if response.status_code != 200:
+            return response.status_code, None, 0, {}
+
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            # Search from just before the new chunk, in case a tag straddles two chunks
+            search_from = max(0, len(buffer) - 256)
+            buffer += chunk
+            end = HEAD_END_RE.search(buffer, search_from)
+            if end:
+                del buffer[end.end():]
+                break
+            if tag_res and all(r.search(buffer) for r in tag_res):
+                break
+            if len(buffer) >= max_bytes:
+                break
+
+        encoding = response.encoding or "utf-8"
+        return response.status_code, bytes(buffer).decode(encoding, errors="replace"), len(buffer), \
+            response_validators(response)
+    finally:
+        # Drops the connection instead of draining the rest of the page
+        response.close()
+
+
+def head_fragment(html):
+    """Everything up to and including </head> (the whole string if there is none)."""
+    match = re.search(r'</head\s*>', html, re.I)
+    return html[:match.end()] if match else html
+
+
+def parse_meta(html, properties=OG_PROPERTIES):
+    """{property: content} for the wanted <meta property="..."> tags in `html`."""
+    # Imported here so web workers only load bs4 once they parse their first page
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("meta"))
+    found = {}
+    for tag in soup.find_all("meta", property=True):
+        prop = tag.get("property")
+        if prop in properties and prop not in found and tag.has_attr("content"):
+            found[prop] = tag["content"]
+    return found
+
+
+def fetch_meta(url, headers=None, timeout=None, session=None, properties=OG_PROPERTIES):
+    """fetch_head() + parse_meta(): the page's meta properties, or None if the page could not be fetched."""
+    _, meta, _ = fetch_meta_conditional(url, headers=headers, timeout=timeout, session=session, properties=properties)
+    return meta
+
+
+def fetch_meta_conditional(url, validators=None, headers=None, timeout=None, session=None, properties=OG_PROPERTIES):
+    """
+    fetch_meta() that can revalidate a cached copy.
+    :return: (status_code, meta dict or None, validators); status 304 means the cached copy is still current
+    """
+    status, head, _, validators = fetch_head(url, headers=headers, timeout=timeout, session=session,
+                                             properties=properties, validators=validators)
+    if status != 200 or head is None:
+        return status, None, validators
+    return status, parse_meta(head, properties), validators
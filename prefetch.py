@@ -0,0 +1,220 @@
+import heapq
+import time
+import datetime
+import threading
+from metrics import REGISTRY
+
+PREFETCH_TOTAL = REGISTRY.counter(
+    "spotscrape_prefetch_total",
+    "Background refreshes by outcome (done, failed, cancelled or skipped)",
+    ("status",)
+)
+PREFETCH_QUEUED = REGISTRY.gauge(
+    "spotscrape_prefetch_queue_depth",
+    "Playlists waiting for a background refresh"
+)
+
+
+def parse_hours(spec):
+    """
+    "1-6,13" -> {1, 2, 3, 4, 5, 13}: local hours in which background work may run.
+    Ranges are end-exclusive and may wrap past midnight ("22-4"). Empty -> None (any hour).
+    """
+    hours = set()
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        start, sep, end = item.partition("-")
+        start = int(start) % 24
+        end = int(end) % 24 if sep else (start + 1) % 24
+        hour = start
+        while True:
+            hours.add(hour)
+            hour = (hour + 1) % 24
+            if hour == end:
+                break
+    return hours or None
+
+
+class PrefetchScheduler:
+    """
+    Keeps popular playlists warm. Every `interval` seconds, inside the
+    off-peak hours, the top-K URLs from `rank()` are queued in priority
+    order (pinned URLs first, then by score). A background thread starts
+    refreshes from the queue, at most `budget` at a time and only while
+    `can_start()` says browsers are free, so user scrapes always come first.
+
+    A URL is never queued or refreshed twice at once, and cancel() drops
+    queued refreshes and stops running ones no user is waiting on.
+    """
+
+    def __init__(self, rank, submit, top_k=10, budget=1, interval=1800, hours=None, pinned=(),
+                 can_start=None, tick=5):
+        """
+        :param rank: Callable(limit) -> [(url, score)], most popular first
+        :param submit: Callable(url) -> a started ScrapeJob, or None when the URL needs no refresh
+        :param top_k: Ranked URLs queued per planning round
+        :param budget: Refreshes (and so browsers) allowed to run at the same time
+        :param interval: Seconds between planning rounds
+        :param hours: Local hours in which refreshes run (see parse_hours), None for any hour
+        :param pinned: URLs always queued ahead of the ranked ones (e.g. the sample playlists)
+        :param can_start: Optional callable() -> bool; False holds back the next refresh
+        :param tick: Seconds between checks of running refreshes
+        """
+        self.rank = rank
+        self.submit = submit
+        self.top_k = top_k
+        self.budget = max(1, int(budget))
+        self.interval = interval
+        self.hours = hours
+        self.pinned = list(dict.fromkeys(pinned))
+        self.can_start = can_start or (lambda: True)
+        self.tick = tick
+        self.counts = {"done": 0, "failed": 0, "cancelled": 0, "skipped": 0}
+        self.last_planned_at = None
+        self._heap = []        # (not pinned, -score, seq, url): pinned URLs first, then the most popular
+        self._queued = {}      # url -> seq of its live heap entry (others are skipped when popped)
+        self._running = {}     # url -> ScrapeJob
+        self._seq = 0
+        self._forced = False   # run_now() was called: drain the queue even outside the off-peak hours
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run_now(self):
+        """Plans a round right away and works through it even outside the off-peak hours."""
+        added = self.plan()
+        with self._lock:
+            self._forced = True
+        self._wake.set()
+        return added
+
+    def in_window(self, now=None):
+        return self.hours is None or (now or datetime.datetime.now()).hour in self.hours
+
+    def plan(self):
+        """Queues the pinned URLs and the current top-K. Returns how many were newly queued."""
+        ranked = [(url, None) for url in self.pinned]
+        ranked += [(url, score) for url, score in self.rank(self.top_k) if url not in self.pinned]
+        added = 0
+        with self._lock:
+            for url, score in ranked:
+                if url in self._running or url in self._queued:
+                    continue
+                self._seq += 1
+                heapq.heappush(self._heap, (score is not None, -(score or 0), self._seq, url))
+                self._queued[url] = self._seq
+                added += 1
+            self.last_planned_at = time.time()
+            PREFETCH_QUEUED.set(len(self._queued))
+        return added
+
+    def cancel(self, url=None):
+        """
+        Drops queued refreshes and cancels running ones, for every URL or just `url`.
+        Running refreshes that a user request has joined are left to finish for that user.
+        :return: Number of refreshes dropped or cancelled
+        """
+        with self._lock:
+            dropped = [u for u in self._queued if url is None or u == url]
+            for u in dropped:
+                del self._queued[u]
+            running = [job for u, job in self._running.items() if (url is None or u == url) and not job.finished]
+            if url is None:
+                self._forced = False
+            PREFETCH_QUEUED.set(len(self._queued))
+        cancelled = sum(1 for job in running if job.cancel(unless_joined=True))
+        return len(dropped) + cancelled
+
+    def stats(self):
+        with self._lock:
+            queued = sorted(entry for entry in self._heap if self._queued.get(entry[3]) == entry[2])
+            return {
+                "thread_alive": self._thread is not None and self._thread.is_alive(),
+                "in_window": self.in_window(),
+                "forced": self._forced,
+                "top_k": self.top_k,
+                "budget": self.budget,
+                "interval": self.interval,
+                "last_planned_at": self.last_planned_at,
+                "queued": [{"url": url, "score": -neg_score if ranked else None, "pinned": not ranked}
+                           for ranked, neg_score, _, url in queued],
+                "running": [{"url": url, "job_id": job.id, "status": job.status,
+                             "collected": job.collected, "expected": job.expected}
+                            for url, job in self._running.items()],
+                "counts": dict(self.counts),
+            }
+
+    # ---------------------------------------------------------
+    # INTERNAL / HELPER FUNCTIONS
+    # ---------------------------------------------------------
+
+    def _loop(self):
+        # Waiting first leaves the process time to finish starting up (e.g. the schema upgrade)
+        while True:
+            self._wake.wait(self.tick)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                due = self.last_planned_at is None or time.time() - self.last_planned_at >= self.interval
+                if due and self.in_window():
+                    self.plan()
+                self._reap()
+                with self._lock:
+                    # A forced round ends once everything it queued has run
+                    if self._forced and not self._queued and not self._running:
+                        self._forced = False
+                    active = self._forced or self.in_window()
+                if active:
+                    self._dispatch()
+            except Exception as e:
+                print(f"Prefetch error: {e}")
+
+    def _reap(self):
+        with self._lock:
+            finished = [(url, job) for url, job in self._running.items() if job.finished]
+            for url, job in finished:
+                del self._running[url]
+                self.counts[job.status] = self.counts.get(job.status, 0) + 1
+                PREFETCH_TOTAL.inc(status=job.status)
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if len(self._running) >= self.budget or not self._queued:
+                    return
+            if not self.can_start():
+                return
+            with self._lock:
+                url = self._pop()
+            if url is None:
+                return
+            job = self.submit(url)
+            with self._lock:
+                if job is None:
+                    self.counts["skipped"] += 1
+                    PREFETCH_TOTAL.inc(status="skipped")
+                else:
+                    self._running[url] = job
+                    print(f"Prefetch: refreshing {url}")
+
+    def _pop(self):
+        while self._heap:
+            _, _, seq, url = heapq.heappop(self._heap)
+            if self._queued.get(url) == seq:
+                del self._queued[url]
+                PREFETCH_QUEUED.set(len(self._queued))
+                return url
+        return None
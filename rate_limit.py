@@ -0,0 +1,123 @@
+import math
+import time
+import threading
+import requests
+from metrics import REGISTRY
+
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "spotscrape_rate_limit_wait_seconds",
+    "Time outbound requests waited for a token of their host's rate limit",
+    ("host",),
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+RATE_LIMITED = REGISTRY.counter(
+    "spotscrape_rate_limited_total",
+    "Outbound requests refused because their host's rate limit wait was too long",
+    ("host",)
+)
+
+
+class RateLimitExceeded(requests.RequestException):
+    """Raised instead of sending a request that would wait too long for its host's rate limit."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    Callers that find it empty reserve a future token and sleep until it is
+    due, so concurrent callers are spaced out instead of all retrying at once.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Sustained requests per second
+        :param burst: Requests allowed back to back after an idle period (default: max(1, rate))
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        Takes one token, unless the wait for it would exceed max_wait.
+        :return: (taken, seconds to wait before the token may be used)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return False, wait
+            self._tokens -= 1
+            return True, wait
+
+
+class HostRateLimiter:
+    """
+    One TokenBucket per outbound host. Hosts without their own limit share
+    the default limit (per host), or are not limited when there is none.
+    """
+
+    def __init__(self, limits=None, default=None, max_wait=10):
+        """
+        :param limits: {host: (rate, burst)}
+        :param default: (rate, burst) for other hosts, or None to leave them unlimited
+        :param max_wait: Longest a request may wait for a token before RateLimitExceeded
+        """
+        self.limits = dict(limits or {})
+        self.default = default
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Blocks until `host` may be sent another request. Raises RateLimitExceeded."""
+        bucket = self._bucket(host)
+        if bucket is None:
+            return 0.0
+        taken, wait = bucket.reserve(self.max_wait)
+        if not taken:
+            RATE_LIMITED.inc(host=host)
+            raise RateLimitExceeded(f"Rate limit for {host} would delay the request more than {self.max_wait}s",
+                                    retry_after=max(1, math.ceil(wait - self.max_wait)))
+        if wait > 0:
+            time.sleep(wait)
+        RATE_LIMIT_WAIT.observe(wait, host=host)
+        return wait
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                limit = self.limits.get(host, self.default)
+                if limit is None:
+                    return None
+                bucket = self._buckets[host] = TokenBucket(*limit)
+            return bucket
+
+
+def parse_rate(value):
+    """"rate[/burst]" -> (rate, burst or None)"""
+    rate, _, burst = value.strip().partition("/")
+    return float(rate), float(burst) if burst else None
+
+
+def parse_limits(spec):
+    """
+    "host=rate[/burst],host=rate[/burst]" -> {host: (rate, burst)}
+    e.g. "open.spotify.com=5/10,www.youtube.com=2"
+    """
+    limits = {}
+    for item in (spec or "").split(","):
+        host, sep, value = item.strip().partition("=")
+        if not sep:
+            continue
+        limits[host.strip().lower()] = parse_rate(value)
+    return limits
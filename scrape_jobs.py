@@ -0,0 +1,184 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScrapeJob:
+    """State of one background scrape, shared by every caller asking for the same URL."""
+
+    def __init__(self, url, key=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.key = key or url
+        self.status = "queued"      # queued -> running -> done | failed | cancelled
+        self.collected = 0
+        self.expected = None
+        self.result = None
+        self.error = None
+        self.timings = None         # Scraper phase timings, when the job ran a scrape
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._callbacks = []
+        self._cancel = threading.Event()
+        self._joined = 0            # Submissions coalesced onto this job after the first
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def cancel_event(self):
+        """Set when cancel() is called, for waits that should stop early (e.g. Ticket.start)."""
+        return self._cancel
+
+    @property
+    def joined(self):
+        return self._joined
+
+    def cancel(self, unless_joined=False):
+        """
+        Asks the job to stop; its run function sees `cancel_requested` and
+        returns early (a queued job still runs it, so it can free what it holds).
+        :param unless_joined: Leave the job alone if another submission joined it
+        :return: False when the job was left alone
+        """
+        with self._lock:
+            if unless_joined and self._joined:
+                return False
+            self._cancel.set()
+            return True
+
+    def _join(self):
+        """Counts another submission onto this job. False once it is being cancelled."""
+        with self._lock:
+            if self._cancel.is_set():
+                return False
+            self._joined += 1
+            return True
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "progress": {
+                "collected": self.collected,
+                "expected": self.expected,
+            },
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ScrapeJobManager:
+    """
+    Runs scrapes on a bounded thread pool and tracks them by job id.
+    Submitting a URL that is already queued or running returns the existing job,
+    unless that job is being cancelled.
+    """
+
+    def __init__(self, max_workers=2, job_ttl=3600):
+        """
+        :param max_workers: Number of scrapes allowed to run at the same time
+        :param job_ttl: Seconds a finished job (and its result) is kept for polling
+        """
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._jobs = {}       # job id -> ScrapeJob
+        self._inflight = {}   # key -> job id of the queued/running job
+        self._lock = threading.Lock()
+
+    def submit(self, url, run, on_done=None, key=None):
+        """
+        Queues `run(job)` for `url` unless the same key is already in flight.
+        :param run: Callable receiving the job and returning the scrape result
+        :param on_done: Optional callable(job) invoked once the job finishes
+        :param key: Coalescing key (default: the URL)
+        :return: (job, created) where created is False for a coalesced submission
+        """
+        key = key or url
+        with self._lock:
+            self._prune()
+            job_id = self._inflight.get(key)
+            # A job being cancelled is not joined: the new submission gets a job of its own
+            if job_id is not None and self._jobs[job_id]._join():
+                job = self._jobs[job_id]
+                if on_done:
+                    job._callbacks.append(on_done)
+                return job, False
+
+            job = ScrapeJob(url, key)
+            if on_done:
+                job._callbacks.append(on_done)
+            self._jobs[job.id] = job
+            self._inflight[key] = job.id
+
+        self._executor.submit(self._run, job, run)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def in_flight(self, key):
+        """The queued/running job for a coalescing key, or None."""
+        with self._lock:
+            job_id = self._inflight.get(key)
+            return self._jobs.get(job_id) if job_id is not None else None
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False if there is no such unfinished job."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def _run(self, job, run):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            # Called even when cancelled while queued: run owns resources (e.g. an admission ticket) it must free
+            result = run(job)
+            if job.cancel_requested:
+                job.error = "Cancelled"
+                job.status = "cancelled"
+            elif result:
+                job.result = result
+                job.status = "done"
+            else:
+                job.error = "Could not scrape playlist data"
+                job.status = "failed"
+        except Exception as e:
+            job.error = f"Scraping failed: {str(e)}"
+            job.status = "cancelled" if job.cancel_requested else "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._inflight.get(job.key) == job.id:
+                    del self._inflight[job.key]
+                callbacks, job._callbacks = job._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Job callback error: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [jid for jid, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
@@ -1,24 +1,174 @@
 import re
 import time
 import json
-import requests
+from itertools import islice
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from driver_pool import get_driver_pool
+from http_tracks import fetch_tracks_http
+from http_client import get_http_client
+from page_meta import fetch_meta_conditional, parse_meta, head_fragment, response_validators
+from tracks import Track, parse_duration, format_total_duration
+from metrics import PhaseTimer
+from metadata_cache import NOT_MODIFIED
+from rate_limit import RateLimitExceeded
+
+# Runs once per scroll step. Returns, as a JSON string, only the tracklist rows
+# not returned by an earlier call on the same page:
+# [[position, title, [artists], album, duration, image_url], ...]
+# position comes from aria-rowindex (null if missing). Pass true to also scroll
+# the last rendered row into view.
+EXTRACT_NEW_ROWS_JS = """
+const seen = window.__spotscrapeSeen || (window.__spotscrapeSeen = new Set());
+const rows = document.querySelectorAll('[data-testid="tracklist-row"]');
+const out = [];
+const durationRe = /^\\d{1,2}:\\d{2}$/;
+
+for (const row of rows) {
+    const holder = row.closest('[aria-rowindex]');
+    const position = holder ? parseInt(holder.getAttribute('aria-rowindex'), 10) : null;
+    const titleEl = row.querySelector('div[dir="auto"]');
+    // Rows still rendering as placeholders are picked up on a later step
+    if (!titleEl) continue;
+    const title = titleEl.textContent.trim();
+    const artists = Array.from(row.querySelectorAll('a[href*="/artist/"]'), a => a.textContent.trim());
+
+    const key = position !== null ? 'p' + position : 't' + title + '|' + artists.join(', ');
+    if (seen.has(key)) continue;
+    seen.add(key);
+
+    const albumEl = row.querySelector('a[href*="/album/"]');
+    const img = row.querySelector('img');
+    const image = img ? (img.getAttribute('src') || (img.getAttribute('srcset') || '').split(' ')[0]) : '';
+
+    let duration = 'Unknown';
+    const texts = [];
+    const walker = document.createTreeWalker(row, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        const text = walker.currentNode.nodeValue.trim();
+        if (text) texts.push(text);
+    }
+    for (let i = texts.length - 1; i >= 0; i--) {
+        if (durationRe.test(texts[i])) { duration = texts[i]; break; }
+    }
+
+    out.push([position, title, artists, albumEl ? albumEl.textContent.trim() : 'Unknown Album', duration, image]);
+}
+
+if (arguments[0] && rows.length) rows[rows.length - 1].scrollIntoView(true);
+return JSON.stringify(out);
+"""
+
+# Scrolls the track list so the row with aria-rowindex == arguments[0] is about
+# in view, using the height of a rendered row to estimate the offset. Used to
+# resume a scrape near the last checkpointed row. Returns false if it cannot.
+SCROLL_TO_ROW_JS = """
+const target = arguments[0];
+const rows = document.querySelectorAll('[data-testid="tracklist-row"]');
+if (!rows.length) return false;
+const first = rows[0].closest('[aria-rowindex]') || rows[0];
+const height = first.getBoundingClientRect().height;
+if (!height) return false;
+
+let scroller = first.parentElement;
+while (scroller && scroller !== document.body) {
+    const overflow = getComputedStyle(scroller).overflowY;
+    if ((overflow === 'auto' || overflow === 'scroll') && scroller.scrollHeight > scroller.clientHeight) break;
+    scroller = scroller.parentElement;
+}
+if (!scroller || scroller === document.body) scroller = document.scrollingElement;
+
+const firstIndex = parseInt(first.getAttribute('aria-rowindex') || '1', 10);
+const offset = first.getBoundingClientRect().top - scroller.getBoundingClientRect().top;
+scroller.scrollTop += offset + (target - firstIndex) * height;
+return true;
+"""
+
+# Installs a MutationObserver that keeps window.__spotscrapeRowMarker set to
+# "<rendered rows>:<last aria-rowindex>", so waits can poll one cheap value.
+ROW_WATCHER_JS = """
+const update = () => {
+    const rows = document.querySelectorAll('[data-testid="tracklist-row"]');
+    const last = rows.length ? rows[rows.length - 1].closest('[aria-rowindex]') : null;
+    window.__spotscrapeRowMarker = rows.length + ':' + (last ? last.getAttribute('aria-rowindex') : '');
+};
+if (window.__spotscrapeRowWatcher) window.__spotscrapeRowWatcher.disconnect();
+window.__spotscrapeRowWatcher = new MutationObserver(update);
+window.__spotscrapeRowWatcher.observe(document.body, { childList: true, subtree: true });
+update();
+return true;
+"""
 
 class SpotifyPlaylistScraper:
-    def __init__(self, url, headless=True):
+    def __init__(self, url, headless=True, driver_pool=None, on_progress=None, extraction_mode="js",
+                 load_timeout=15, step_timeout=0.5, max_step_timeout=4.0, stall_timeout=12, engine="auto",
+                 metadata_cache=None, on_phase=None, checkpoint_store=None, checkpoint_every=200, resume=True,
+                 browser_retries=1):
         """
         Initialize the scraper with a playlist URL.
         :param url: Spotify Playlist URL
         :param headless: Run Chrome in background (default True)
+        :param driver_pool: DriverPool to borrow Chrome from (default: shared process pool)
+        :param on_progress: Optional callable(collected, expected) called as tracks are found
+        :param extraction_mode: "js" to extract new rows in the browser (default),
+                                "soup" to re-parse the page HTML with BeautifulSoup
+        :param load_timeout: Seconds to wait for the first track row after page load
+        :param step_timeout: Initial seconds to wait for new rows after each scroll
+        :param max_step_timeout: Upper bound for the per-scroll wait as it backs off
+        :param stall_timeout: Give up after this many seconds without new rows
+        :param engine: "auto" tries plain HTTP first and falls back to Selenium when it fails
+                       or comes back short, "http" never launches a browser, "browser" always does
+        :param metadata_cache: Optional MetadataCache shared between scrapes of the same playlist
+        :param on_phase: Optional callable(name, seconds) called as each scrape phase ends
+                         (metadata, http_tracks, driver_wait/install/launch, page_load,
+                         first_row, scroll_step, parse, total)
+        :param checkpoint_store: Optional CheckpointStore where browser scrapes save collected rows
+        :param checkpoint_every: Save a checkpoint after this many new rows
+        :param resume: Continue from a saved checkpoint instead of starting from the first row
+        :param browser_retries: Times a crashed or stalled browser scrape is reopened and resumed
         """
         self.url = url
         self.headless = headless
-        self.data = None  # Stores the final result dictionary
-        self.tracks_list = [] # Shortcut to access tracks list
+        self.driver_pool = driver_pool
+        self.on_progress = on_progress
+        self.extraction_mode = extraction_mode
+        self.load_timeout = load_timeout
+        self.step_timeout = step_timeout
+        self.max_step_timeout = max_step_timeout
+        self.stall_timeout = stall_timeout
+        self.engine = engine
+        self.engine_used = None  # "http" or "browser" after scrape()
+        self.metadata_cache = metadata_cache
+        self.scroll_stats = None  # Wait/work timings of the last Selenium run
+        self.on_phase = on_phase
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        self.browser_retries = browser_retries
+        self.timer = None  # PhaseTimer of the last scrape
+        self._page_html = None  # Playlist page downloaded by _fetch_metadata
+        self.meta = None  # Playlist metadata, available before the first track
+        self.playlist_info = None  # Summary of the last completed scrape
+        self.tracks_list = [] # Track objects of the last completed scrape
+        self._columns = {}  # Column name -> values, built on first get_column_data()
+
+    @property
+    def data(self):
+        """
+        Result dictionary {"playlist_info": ..., "tracks": [track dicts]} of the last
+        completed scrape, or None. Built from the compact Track list on each access.
+        """
+        if self.playlist_info is None:
+            return None
+        return {"playlist_info": self.playlist_info, "tracks": [t.to_dict() for t in self.tracks_list]}
+
+    @property
+    def timing_report(self):
+        """Per-phase timings of the last scrape (see PhaseTimer.report()), or None."""
+        return self.timer.report() if self.timer else None
         
     # ---------------------------------------------------------
     # PUBLIC METHODS (User facing)
@@ -29,61 +179,45 @@ class SpotifyPlaylistScraper:
         Main method to trigger the scraping process.
         Populates self.data and self.tracks_list.
         """
-        print(f"--- Starting Scrape for: {self.url} ---")
-        
-        # 1. Get Metadata (Title, Image, Owner, Count)
-        meta = self._fetch_metadata()
-        if not meta:
-            print("Error: Could not fetch metadata.")
-            return
-
-        print(f"Found: {meta['title']} ({meta['total_tracks']} tracks)")
-        print("Launching Selenium to scrape tracks...")
-
-        # 2. Get Tracks (Selenium)
-        tracks = self._fetch_tracks_selenium(expected_count=meta['total_tracks'])
-        
-        # 3. Calculate Totals
-        total_seconds = sum(self._text_to_seconds(t['duration']) for t in tracks)
-        formatted_duration = self._seconds_to_text(total_seconds)
-
-        # 4. Store Result
-        self.tracks_list = tracks
-        self.data = {
-            "playlist_info": {
-                "title": meta['title'],
-                "owner": meta['owner'],
-                "description": meta['description'],
-                "image_url": meta['image_url'],
-                "url": meta['spotify_url'],
-                "total_tracks_declared": meta['total_tracks'],
-                "total_tracks_scraped": len(tracks),
-                "total_duration_str": formatted_duration,
-                "total_duration_seconds": total_seconds
-            },
-            "tracks": tracks
-        }
-        print(f"--- Scrape Complete: {len(tracks)} tracks retrieved ---")
+        for _ in self.iter_tracks():
+            pass
         return self.data
 
+    def iter_tracks(self):
+        """
+        Generator version of scrape(): yields each track (as a dict) as soon as it is found.
+        self.meta is set before the first track; self.data and self.tracks_list are
+        populated once the generator is exhausted. Tracks found by Selenium carry a
+        provisional index in discovery order, final order is in self.tracks_list.
+        """
+        self.timer = PhaseTimer(self.on_phase)
+        try:
+            yield from self._scrape_tracks()
+        finally:
+            self.timer.add("total", time.monotonic() - self.timer.started)
+
     def get_column_data(self, column_name):
         """
         Returns a list of values for a specific column.
-        Valid columns: 'title', 'artist', 'album', 'duration', 'image_url', 'index'
+        Valid columns: 'title', 'artist', 'album', 'duration', 'duration_seconds', 'image_url', 'index'
+        Each column is built once per scrape and cached.
         """
         if not self.tracks_list:
             print("No data found. Please run .scrape() first.")
             return []
         
-        if column_name not in ["title", "artist", "album", "duration", "image_url", "index"]:
+        if column_name not in Track.FIELDS and column_name != "duration_seconds":
             print(f"Invalid column name: {column_name}")
             return []
 
-        return [t.get(column_name, "N/A") for t in self.tracks_list]
+        column = self._columns.get(column_name)
+        if column is None:
+            column = self._columns[column_name] = [getattr(t, column_name) for t in self.tracks_list]
+        return list(column)
 
     def get_track_range(self, start_index, end_index):
         """
-        Returns a subset of tracks based on index range (1-based index).
+        Returns a subset of tracks (as dicts, like self.data) based on index range (1-based index).
         e.g., get_track_range(1, 10) returns first 10 tracks.
         """
         if not self.tracks_list:
@@ -94,17 +228,18 @@ class SpotifyPlaylistScraper:
         start = max(0, start_index - 1)
         end = min(len(self.tracks_list), end_index)
         
-        return self.tracks_list[start:end]
+        return [t.to_dict() for t in self.tracks_list[start:end]]
 
     def save_to_json(self, filename="playlist_data.json"):
         """Downloads/Saves the scraped data to a JSON file."""
-        if not self.data:
+        data = self.data
+        if not data:
             print("No data to save. Please run .scrape() first.")
             return
         
         try:
             with open(filename, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+                json.dump(data, f, ensure_ascii=False, indent=2)
             print(f"Successfully saved to {filename}")
         except Exception as e:
             print(f"Error saving file: {e}")
@@ -113,19 +248,95 @@ class SpotifyPlaylistScraper:
     # INTERNAL / HELPER METHODS
     # ---------------------------------------------------------
 
+    def _scrape_tracks(self):
+        """Body of iter_tracks(), timed by its wrapper."""
+        print(f"--- Starting Scrape for: {self.url} ---")
+        self.playlist_info = None
+        
+        # 1. Get Metadata (Title, Image, Owner, Count)
+        with self.timer.phase("metadata"):
+            if self.metadata_cache:
+                meta = self.metadata_cache.get_or_revalidate(self.url, self._revalidate_metadata, namespace="playlist")
+            else:
+                meta = self._fetch_metadata()
+        if not meta:
+            print("Error: Could not fetch metadata.")
+            return
+        meta = dict(meta, spotify_url=self.url)
+        self.meta = meta
+
+        print(f"Found: {meta['title']} ({meta['total_tracks']} tracks)")
+        self._report_progress(0, meta['total_tracks'])
+
+        # 2. Get Tracks (plain HTTP first, Selenium if that fails or comes back short)
+        tracks = None
+        if self.engine in ("auto", "http"):
+            with self.timer.phase("http_tracks"):
+                tracks = self._fetch_tracks_http(expected_count=meta['total_tracks'])
+            if tracks is not None:
+                self.engine_used = "http"
+                for track in tracks:
+                    yield track.to_dict()
+
+        if tracks is None and self.engine == "http":
+            print("Error: Could not extract tracks over HTTP.")
+            return
+
+        if tracks is None:
+            print("Launching Selenium to scrape tracks...")
+            self.engine_used = "browser"
+            unique_tracks = {}
+            yield from self._iter_tracks_browser(meta['total_tracks'], unique_tracks)
+            tracks = self._order_tracks(unique_tracks, meta['total_tracks'])
+        
+        # 3. Calculate Totals
+        total_seconds = sum(t.duration_seconds or 0 for t in tracks)
+        formatted_duration = self._seconds_to_text(total_seconds)
+
+        # 4. Store Result
+        self.tracks_list = tracks
+        self._columns = {}
+        self.playlist_info = {
+            "title": meta['title'],
+            "owner": meta['owner'],
+            "description": meta['description'],
+            "image_url": meta['image_url'],
+            "url": meta['spotify_url'],
+            "total_tracks_declared": meta['total_tracks'],
+            "total_tracks_scraped": len(tracks),
+            "total_duration_str": formatted_duration,
+            "total_duration_seconds": total_seconds
+        }
+        print(f"--- Scrape Complete: {len(tracks)} tracks retrieved ---")
+
     def _fetch_metadata(self):
+        return self._revalidate_metadata()[0]
+
+    def _revalidate_metadata(self, validators=None):
+        """
+        Fetches the playlist metadata, conditionally when `validators` of a cached copy are given.
+        :return: (metadata dict, NOT_MODIFIED or None; response validators)
+        """
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
         try:
-            response = requests.get(self.url, headers=headers, timeout=10)
-            if response.status_code != 200:
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.find("meta", property="og:title")
-            desc = soup.find("meta", property="og:description")
-            image = soup.find("meta", property="og:image")
+            if self.engine == "browser":
+                # Tracks come from the browser, so only the page head is downloaded (or nothing, on a 304)
+                status, og, validators = fetch_meta_conditional(self.url, validators, headers=headers, timeout=10)
+                if status == 304:
+                    return NOT_MODIFIED, validators
+                if og is None:
+                    return None, {}
+            else:
+                # Unconditional: the HTTP engine reads the tracks from this same page, which a 304 would not carry
+                response = get_http_client().get(self.url, headers=headers, timeout=10)
+                if response.status_code != 200:
+                    return None, {}
+                # The HTTP engine reuses the full page; the metadata only needs its head
+                self._page_html = response.text
+                validators = response_validators(response)
+                og = parse_meta(head_fragment(response.text))
             
-            description_text = desc["content"].strip() if desc else ""
+            description_text = og.get("og:description", "").strip()
             
             # Extract Owner
             owner = "Unknown"
@@ -142,137 +353,344 @@ class SpotifyPlaylistScraper:
                 total_tracks = int(count_match.group(1).replace(',', ''))
 
             return {
-                "title": title["content"].strip() if title else "Unknown",
+                "title": og["og:title"].strip() if "og:title" in og else "Unknown",
                 "description": description_text,
-                "image_url": image["content"] if image else "",
+                "image_url": og.get("og:image", ""),
                 "owner": owner,
                 "total_tracks": total_tracks,
                 "spotify_url": self.url
-            }
+            }, validators
+        except RateLimitExceeded:
+            raise  # Throttled, not broken: callers report it as such
         except Exception as e:
             print(f"Metadata Error: {e}")
+            return None, {}
+
+    def _fetch_tracks_http(self, expected_count=None):
+        """Returns tracks read from the page data, or None if missing or incomplete."""
+        tracks = fetch_tracks_http(self.url, html=self._page_html)
+        if not tracks:
+            return None
+        if expected_count and len(tracks) < expected_count:
+            if self.engine == "http":
+                print(f"HTTP extraction returned {len(tracks)}/{expected_count} tracks")
+                return tracks
+            print(f"HTTP extraction returned {len(tracks)}/{expected_count} tracks, using browser")
             return None
+        if expected_count and len(tracks) > expected_count:
+            tracks = tracks[:expected_count]
+        self._report_progress(len(tracks), expected_count)
+        return tracks
 
     def _fetch_tracks_selenium(self, expected_count=None):
-        options = webdriver.ChromeOptions()
-        if self.headless:
-            options.add_argument("--headless=new")
-        
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--log-level=3")
-
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        if self.timer is None:
+            self.timer = PhaseTimer(self.on_phase)
         unique_tracks = {}
+        for _ in self._iter_tracks_selenium(expected_count, unique_tracks):
+            pass
+        return self._order_tracks(unique_tracks, expected_count)
+
+    def _iter_tracks_browser(self, expected_count, unique_tracks):
+        """
+        Runs _iter_tracks_selenium with checkpoints: rows saved by an earlier attempt
+        are loaded first, new rows are saved every `checkpoint_every` rows, and after a
+        browser crash or stall the page is reopened and the scrape resumes near the
+        last collected row, up to `browser_retries` times.
+        """
+        store = self.checkpoint_store
+        if store and self.resume:
+            for position, track in store.load(self.url, expected_count).items():
+                unique_tracks[position] = (position, track)
+                if not expected_count or len(unique_tracks) <= expected_count:
+                    yield dict(track.to_dict(), index=len(unique_tracks))
+            if unique_tracks:
+                print(f"Resuming from checkpoint: {len(unique_tracks)} rows")
+        saved = len(unique_tracks)
+
+        attempts = 1 + max(0, self.browser_retries)
+        try:
+            for attempt in range(1, attempts + 1):
+                try:
+                    for track in self._iter_tracks_selenium(expected_count, unique_tracks):
+                        yield track
+                        if store and len(unique_tracks) - saved >= self.checkpoint_every:
+                            saved = self._save_checkpoint(unique_tracks, saved, expected_count)
+                except Exception as e:
+                    if attempt == attempts:
+                        raise
+                    print(f"Browser scrape failed after {len(unique_tracks)} rows, resuming: {e}")
+                    continue
+                if self.scroll_stats["exit_reason"] != "stalled" or attempt == attempts:
+                    break
+                print(f"Scrape stalled after {len(unique_tracks)} rows, reopening the page to resume")
+        finally:
+            if store:
+                if self.scroll_stats and self.scroll_stats["exit_reason"] in ("complete", "last_row", "checkpoint"):
+                    store.clear(self.url)
+                else:
+                    self._save_checkpoint(unique_tracks, saved, expected_count)
 
+    def _save_checkpoint(self, unique_tracks, saved, expected_count):
+        """Saves rows added to `unique_tracks` since the first `saved`. Returns the new saved count."""
         try:
-            driver.get(self.url)
-            time.sleep(3)
+            self.checkpoint_store.save(self.url, islice(unique_tracks.values(), saved, None), expected_count)
+        except Exception as e:
+            print(f"Checkpoint error: {e}")
+            return saved
+        return len(unique_tracks)
+
+    def _iter_tracks_selenium(self, expected_count, unique_tracks):
+        """
+        Scrolls the playlist in Chrome, filling `unique_tracks` (row key -> (position, Track))
+        and yielding each new track as a dict as it appears.
+        """
+        pool = self.driver_pool or get_driver_pool(headless=self.headless)
+        stats = {"wait_seconds": 0.0, "work_seconds": 0.0, "scroll_steps": 0, "stall_waits": 0, "exit_reason": None}
+        self.scroll_stats = stats
 
-            last_len = 0
-            no_change = 0
+        # Rows already collected (from a checkpoint or an earlier attempt)
+        positions = [position for position, _ in unique_tracks.values() if position is not None]
+        first_pos = min(positions) if positions else None
+        last_pos = max(positions) if positions else None
+        unpositioned = len(unique_tracks) - len(positions)
+        if expected_count and len(unique_tracks) >= expected_count:
+            stats["exit_reason"] = "checkpoint"
+            return
+
+        with pool.driver(on_phase=self.timer.add) as driver:
+            # Drops traffic logged before this scrape (no-op unless the pool measures network)
+            network_usage = getattr(pool, "network_usage", None)
+            if network_usage:
+                network_usage(driver)
+            with self.timer.phase("page_load"):
+                driver.get(self.url)
+            first_row_wait = self._wait_for_first_row(driver)
+            self.timer.add("first_row", first_row_wait)
+            stats["wait_seconds"] += first_row_wait
+
+            use_js = self.extraction_mode == "js"
+            watching = self._install_row_watcher(driver)
+            step_timeout = self.step_timeout
+            last_progress = time.monotonic()
+            if last_pos is not None:
+                # Resuming: jump close to the last collected row instead of scrolling from the top
+                self._jump_to_row(driver, max(1, last_pos - 5))
             
             while True:
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                rows = soup.find_all("div", {"data-testid": "tracklist-row"})
-
-                for row in rows:
-                    try:
-                        # Basic Info
-                        title_div = row.find("div", {"dir": "auto"})
-                        title = title_div.get_text().strip() if title_div else "Unknown"
-
-                        # Artist
-                        artist_links = row.find_all("a", href=lambda h: h and "/artist/" in h)
-                        if artist_links:
-                            artists = [a.get_text().strip() for a in artist_links]
-                            artist_str = ", ".join(dict.fromkeys(artists))
-                        else:
-                            artist_str = "Unknown Artist"
-
-                        key = f"{title}|{artist_str}"
-                        
+                with self.timer.phase("scroll_step"):
+                    work_start = time.monotonic()
+                    marker = self._row_marker(driver) if watching else None
+                    scrolled = False
+                    parse_start = time.monotonic()
+                    if use_js:
+                        try:
+                            # Extract unseen rows and scroll in a single round trip
+                            rows = json.loads(driver.execute_script(EXTRACT_NEW_ROWS_JS, True))
+                            scrolled = True
+                        except Exception as e:
+                            print(f"JS extraction failed, falling back to HTML parsing: {e}")
+                            use_js = False
+
+                    if not use_js:
+                        rows = self._parse_rows_soup(driver.page_source)
+                    self.timer.add("parse", time.monotonic() - parse_start)
+
+                    new_rows = 0
+                    for position, title, artists, album, duration, track_img in rows:
+                        artist_str = ", ".join(dict.fromkeys(artists)) if artists else "Unknown Artist"
+                        # Row position identifies a row even when the same song appears twice
+                        key = position if position is not None else f"{title}|{artist_str}"
                         if key not in unique_tracks:
-                            album_link = row.find("a", href=lambda h: h and "/album/" in h)
-                            album = album_link.get_text().strip() if album_link else "Unknown Album"
-
-                            # Image
-                            img_tag = row.find("img")
-                            track_img = img_tag.get("src") or img_tag.get("srcset", "").split(" ")[0] if img_tag else ""
-
-                            # Duration (Strict parsing from last valid time-string)
-                            duration = "Unknown"
-                            all_text = [t.strip() for t in row.stripped_strings]
-                            for text in reversed(all_text):
-                                if re.match(r'^\d{1,2}:\d{2}$', text):
-                                    duration = text
-                                    break
-                            
-                            unique_tracks[key] = {
-                                "title": title,
-                                "artist": artist_str,
-                                "album": album,
-                                "duration": duration,
-                                "image_url": track_img
-                            }
-                    except:
-                        continue
+                            new_rows += 1
+                            if position is None:
+                                unpositioned += 1
+                            else:
+                                first_pos = position if first_pos is None else min(first_pos, position)
+                                last_pos = position if last_pos is None else max(last_pos, position)
+                            track = Track(title, artist_str, album, parse_duration(duration), track_img)
+                            unique_tracks[key] = (position, track)
+                            if not expected_count or len(unique_tracks) <= expected_count:
+                                yield dict(track.to_dict(), index=len(unique_tracks))
                 
-                # Check limits
-                curr_count = len(unique_tracks)
-                if expected_count and curr_count >= expected_count:
-                    break
+                    # Check limits
+                    curr_count = len(unique_tracks)
+                    self._report_progress(curr_count, expected_count)
+                    if expected_count and curr_count >= expected_count:
+                        stats["exit_reason"] = "complete"
+                        stats["work_seconds"] += time.monotonic() - work_start
+                        break
+                    # Rows spanning the declared count have been seen (e.g. unavailable tracks skipped)
+                    if expected_count and not unpositioned and first_pos is not None \
+                            and last_pos - first_pos + 1 >= expected_count:
+                        stats["exit_reason"] = "last_row"
+                        stats["work_seconds"] += time.monotonic() - work_start
+                        break
                 
-                # Scroll
-                web_rows = driver.find_elements(By.CSS_SELECTOR, '[data-testid="tracklist-row"]')
-                if web_rows:
-                    driver.execute_script("arguments[0].scrollIntoView(true);", web_rows[-1])
-                    time.sleep(1.5)
-                else:
-                    time.sleep(1)
+                    # Scroll
+                    if not scrolled:
+                        web_rows = driver.find_elements(By.CSS_SELECTOR, '[data-testid="tracklist-row"]')
+                        if web_rows:
+                            driver.execute_script("arguments[0].scrollIntoView(true);", web_rows[-1])
+                    stats["scroll_steps"] += 1
+                    stats["work_seconds"] += time.monotonic() - work_start
 
-                if curr_count == last_len:
-                    no_change += 1
-                else:
-                    no_change = 0
-                    last_len = curr_count
-                
-                if no_change >= 15:
-                    break
+                    if new_rows:
+                        step_timeout = self.step_timeout
+                        last_progress = time.monotonic()
+                    elif time.monotonic() - last_progress >= self.stall_timeout:
+                        stats["exit_reason"] = "stalled"
+                        break
+
+                    # Wait for the list to change instead of sleeping a fixed time
+                    if watching:
+                        waited, changed = self._wait_for_rows(driver, marker, step_timeout)
+                    else:
+                        waited, changed = self._sleep(step_timeout), False
+                    stats["wait_seconds"] += waited
+
+                    if not changed:
+                        stats["stall_waits"] += 1
+                        # Back off: give slow renders progressively longer
+                        step_timeout = min(step_timeout * 2, self.max_step_timeout)
 
-            # Convert to list with index
-            track_list = []
-            for i, (k, v) in enumerate(unique_tracks.items(), 1):
-                v['index'] = i
-                track_list.append(v)
+            if network_usage:
+                stats["network"] = network_usage(driver)
+            print(
+                f"Scroll stats: {stats['scroll_steps']} steps, "
+                f"{stats['wait_seconds']:.1f}s waiting, {stats['work_seconds']:.1f}s working "
+                f"(exit: {stats['exit_reason']})"
+            )
+
+    @staticmethod
+    def _order_tracks(unique_tracks, expected_count=None):
+        """Converts collected rows to the final track list with index (playlist order when every row has a position)."""
+        rows = list(unique_tracks.values())
+        if all(position is not None for position, _ in rows):
+            rows.sort(key=lambda row: row[0])
+
+        track_list = []
+        for i, (_, track) in enumerate(rows, 1):
+            track.index = i
+            track_list.append(track)
+        
+        if expected_count and len(track_list) > expected_count:
+            track_list = track_list[:expected_count]
             
-            if expected_count and len(track_list) > expected_count:
-                track_list = track_list[:expected_count]
-                
-            return track_list
+        return track_list
 
-        finally:
-            driver.quit()
+    def _wait_for_first_row(self, driver):
+        """Waits until the first tracklist row renders. Returns seconds waited."""
+        start = time.monotonic()
+        try:
+            WebDriverWait(driver, self.load_timeout, poll_frequency=0.1).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="tracklist-row"]'))
+            )
+        except TimeoutException:
+            print(f"No tracklist rows after {self.load_timeout}s")
+        return time.monotonic() - start
+
+    @staticmethod
+    def _install_row_watcher(driver):
+        try:
+            return bool(driver.execute_script(ROW_WATCHER_JS))
+        except Exception as e:
+            print(f"Row watcher unavailable, using timed waits: {e}")
+            return False
+
+    @staticmethod
+    def _jump_to_row(driver, position):
+        try:
+            if driver.execute_script(SCROLL_TO_ROW_JS, position):
+                print(f"Jumped to row {position}")
+                return True
+        except Exception as e:
+            print(f"Could not jump to row {position}, scrolling from the top: {e}")
+        return False
 
     @staticmethod
-    def _text_to_seconds(time_str):
-        if not time_str or time_str == "Unknown": return 0
+    def _row_marker(driver):
+        try:
+            return driver.execute_script("return window.__spotscrapeRowMarker;")
+        except Exception:
+            return None
+
+    def _wait_for_rows(self, driver, marker, timeout):
+        """
+        Waits up to `timeout` seconds for the rendered rows to change.
+        Returns (seconds waited, whether a change was seen).
+        """
+        start = time.monotonic()
         try:
-            parts = list(map(int, time_str.split(':')))
-            if len(parts) == 3: return parts[0]*3600 + parts[1]*60 + parts[2]
-            elif len(parts) == 2: return parts[0]*60 + parts[1]
-        except: return 0
-        return 0
+            WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+                lambda d: d.execute_script("return window.__spotscrapeRowMarker;") != marker
+            )
+            changed = True
+        except TimeoutException:
+            changed = False
+        return time.monotonic() - start, changed
+
+    @staticmethod
+    def _sleep(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    @staticmethod
+    def _parse_rows_soup(html):
+        """
+        Fallback row parser over the full page HTML.
+        Returns rows in the same shape as EXTRACT_NEW_ROWS_JS:
+        (position, title, artists, album, duration, image_url)
+        """
+        soup = BeautifulSoup(html, "html.parser")
+        rows = []
+
+        for row in soup.find_all("div", {"data-testid": "tracklist-row"}):
+            try:
+                # Position
+                holder = row if row.has_attr("aria-rowindex") else row.find_parent(attrs={"aria-rowindex": True})
+                position = int(holder["aria-rowindex"]) if holder else None
+
+                # Basic Info
+                title_div = row.find("div", {"dir": "auto"})
+                if not title_div:
+                    continue
+                title = title_div.get_text().strip()
+
+                # Artist
+                artist_links = row.find_all("a", href=lambda h: h and "/artist/" in h)
+                artists = [a.get_text().strip() for a in artist_links]
+
+                album_link = row.find("a", href=lambda h: h and "/album/" in h)
+                album = album_link.get_text().strip() if album_link else "Unknown Album"
+
+                # Image
+                img_tag = row.find("img")
+                track_img = img_tag.get("src") or img_tag.get("srcset", "").split(" ")[0] if img_tag else ""
+
+                # Duration (Strict parsing from last valid time-string)
+                duration = "Unknown"
+                all_text = [t.strip() for t in row.stripped_strings]
+                for text in reversed(all_text):
+                    if re.match(r'^\d{1,2}:\d{2}$', text):
+                        duration = text
+                        break
+
+                rows.append((position, title, artists, album, duration, track_img))
+            except:
+                continue
+
+        return rows
+
+    def _report_progress(self, collected, expected):
+        if self.on_progress:
+            try:
+                self.on_progress(collected, expected)
+            except Exception as e:
+                print(f"Progress callback error: {e}")
 
     @staticmethod
     def _seconds_to_text(total_seconds):
-        if total_seconds == 0: return "0 min"
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        if hours > 0: return f"{hours} hr {minutes} min"
-        return f"{minutes} min"
+        return format_total_duration(total_seconds)
 
 # ---------------------------------------------------------
 # EXAMPLE USAGE
@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A full-role app whose database and caches live in a temporary directory."""
+    import app as app_module
+    flask_app = app_module.create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'database.db'}",
+        "METADATA_CACHE_PATH": str(tmp_path / "metadata_cache.db"),
+        "YOUTUBE_CACHE_PATH": str(tmp_path / "youtube_cache.db"),
+        "SCRAPE_CHECKPOINT_PATH": str(tmp_path / "scrape_checkpoints.db"),
+    })
+    with flask_app.app_context():
+        app_module.init_db()
+    yield flask_app
+    app_module.scrape_jobs.shutdown(wait=True)
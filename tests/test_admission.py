@@ -0,0 +1,86 @@
+import time
+import threading
+import pytest
+import app as app_module
+from admission import AdmissionController, AdmissionRejected
+
+URL = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M"
+
+
+def test_full_queue_is_rejected_straight_away():
+    admission = AdmissionController(max_active=1, max_queued=1)
+    running = admission.reserve()
+    running.start()
+    waiting = admission.reserve()
+    with pytest.raises(AdmissionRejected) as e:
+        admission.reserve()
+    assert e.value.retry_after >= 1
+
+    with pytest.raises(AdmissionRejected):
+        waiting.start(timeout=0.05)
+    running.release()
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["queued"] == 0
+
+
+def test_cancel_event_stops_a_queued_start():
+    admission = AdmissionController(max_active=1, max_queued=1, queue_timeout=30)
+    running = admission.reserve()
+    running.start()
+    waiting = admission.reserve()
+    cancel = threading.Event()
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(waiting.start(cancel=cancel)))
+    thread.start()
+
+    time.sleep(0.1)
+    started = time.monotonic()
+    cancel.set()
+    thread.join(5)
+    assert outcome == [False]
+    assert time.monotonic() - started < 2
+    assert admission.stats()["queued"] == 0
+
+    waiting.release()  # Spent: does not free anything twice
+    assert admission.stats()["queued"] == 0
+    assert admission.stats()["active"] == 1
+    running.release()
+
+
+def test_cancel_event_does_not_stop_a_ticket_with_a_free_slot():
+    admission = AdmissionController(max_active=1, max_queued=0)
+    cancel = threading.Event()
+    ticket = admission.reserve()
+    assert ticket.start(cancel=cancel)
+    ticket.release()
+
+
+def test_cancelled_queued_scrape_frees_its_ticket_promptly(app):
+    admission = app_module.scrape_admission
+    holders = []
+    while admission.free_slots():
+        ticket = admission.reserve()
+        ticket.start()
+        holders.append(ticket)
+
+    client = app.test_client()
+    try:
+        job = client.post("/scrape-playlist", json={"url": URL, "refresh": True}).get_json()
+        for _ in range(100):
+            if client.get(job["status_url"]).get_json()["status"] == "running":
+                break
+            time.sleep(0.02)
+        assert admission.stats()["queued"] == 1
+
+        assert app_module.scrape_jobs.cancel(job["job_id"])
+        started = time.monotonic()
+        for _ in range(100):
+            if client.get(job["status_url"]).get_json()["status"] == "cancelled":
+                break
+            time.sleep(0.02)
+        assert client.get(job["status_url"]).get_json()["status"] == "cancelled"
+        assert time.monotonic() - started < 2
+        assert admission.stats()["queued"] == 0
+    finally:
+        for ticket in holders:
+            ticket.release()
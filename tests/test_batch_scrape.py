@@ -0,0 +1,53 @@
+import os
+import json
+import threading
+import batch_scrape
+
+
+class FakeScraper:
+    pools = []
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self, url, driver_pool=None, **kwargs):
+        self.url = url
+        self.engine_used = "http"
+        with FakeScraper.lock:
+            FakeScraper.pools.append(driver_pool)
+            FakeScraper.calls.append(url)
+
+    def scrape(self):
+        if "broken" in self.url:
+            raise RuntimeError("page changed")
+        return {
+            "playlist_info": {"title": self.url.rsplit("/", 1)[-1], "url": self.url},
+            "tracks": [{"title": "Song", "artist": "Artist", "album": "Album", "duration": "3:00",
+                        "image_url": "", "index": 1}],
+        }
+
+
+def test_batch_dedupes_urls_and_uses_its_own_pool(tmp_path, monkeypatch):
+    FakeScraper.pools, FakeScraper.calls = [], []
+    monkeypatch.setattr(batch_scrape, "SpotifyPlaylistScraper", FakeScraper)
+    urls = [
+        "https://open.spotify.com/playlist/aaa",
+        "https://open.spotify.com/playlist/aaa?si=123",
+        "https://open.spotify.com/intl-de/playlist/aaa/",
+        "https://open.spotify.com/playlist/bbb",
+        "https://open.spotify.com/playlist/broken",
+    ]
+
+    manifest = batch_scrape.scrape_batch(urls, str(tmp_path), workers=3)
+
+    assert sorted(FakeScraper.calls) == sorted([urls[0], urls[3], urls[4]])
+    assert [r["url"] for r in manifest["results"]] == [urls[0], urls[3], urls[4]]
+    assert manifest["counts"] == {"total": 3, "done": 2, "failed": 1, "cancelled": 0, "tracks": 2}
+    assert sorted(os.listdir(tmp_path)) == ["aaa.json", "bbb.json", "manifest.json"]
+    with open(tmp_path / "manifest.json") as f:
+        assert json.load(f)["counts"]["total"] == 3
+
+    pools = set(FakeScraper.pools)
+    assert len(pools) == 1
+    pool = pools.pop()
+    assert pool.size == 3
+    assert pool._closed
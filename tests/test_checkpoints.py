@@ -0,0 +1,64 @@
+import sqlite3
+import pytest
+import checkpoints
+import metadata_cache
+from checkpoints import CheckpointStore
+from metadata_cache import SQLiteStore
+from tracks import Track
+
+URL = "https://open.spotify.com/playlist/abc"
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Records every connection the stores open."""
+    connections = []
+    connect = sqlite3.connect
+
+    def recording_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(checkpoints.sqlite3, "connect", recording_connect)
+    monkeypatch.setattr(metadata_cache.sqlite3, "connect", recording_connect)
+    return connections
+
+
+def _assert_closed(connections):
+    assert connections
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_checkpoint_round_trip_closes_connections(tmp_path, opened):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    store.save(URL + "?si=x", [(1, Track("A", "Artist", "Album", 180)), (None, Track("B", "Artist", "Album"))],
+               expected=2)
+    loaded = store.load(URL, expected=2)
+    assert list(loaded) == [1]
+    assert loaded[1].title == "A"
+    assert store.load(URL, expected=3) == {}
+    assert store.load(URL) == {}
+    _assert_closed(opened)
+
+
+def test_prune_removes_expired_checkpoints(tmp_path, opened):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"), max_age=-1)
+    store.save(URL, [(1, Track("A", "Artist", "Album"))])
+    assert store.prune() == 1
+    assert store.prune() == 0
+    _assert_closed(opened)
+
+
+def test_sqlite_store_closes_connections(tmp_path, opened):
+    store = SQLiteStore(str(tmp_path / "cache.db"), max_entries=2)
+    store.set("a", {"v": 1}, ttl=60)
+    store.set("b", {"v": 2}, ttl=60)
+    store.set("c", {"v": 3}, ttl=60)
+    assert store.get("c") == {"v": 3}
+    assert len(store) == 2
+    store.delete("c")
+    assert store.get("c") is None
+    _assert_closed(opened)
@@ -0,0 +1,31 @@
+import pytest
+import app as app_module
+
+TITLES = ["100% Hits", "100 Greatest", "snake_case beats", "snakeXcase", "back\\slash", "Backslash"]
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user = app_module.User(username="u", email="u@example.com", password_hash="x",
+                               security_question="q", security_answer="a")
+        app_module.db.session.add(user)
+        app_module.db.session.flush()
+        for title in TITLES:
+            app_module.db.session.add(app_module.History(title=title, description="", user_id=user.id,
+                                                         spotify_url="https://open.spotify.com/playlist/abc"))
+        app_module.db.session.commit()
+        yield user.id
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("100%", ["100% Hits"]),
+    ("snake_case", ["snake_case beats"]),
+    ("k\\s", ["back\\slash"]),
+    ("_", ["snake_case beats"]),
+    ("100", ["100% Hits", "100 Greatest"]),
+])
+def test_search_matches_wildcards_literally(app, user_id, search, expected):
+    with app.app_context():
+        titles = [item.title for item in app_module.history_query(user_id, search=search)]
+    assert sorted(titles) == sorted(expected)
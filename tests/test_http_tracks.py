@@ -0,0 +1,139 @@
+import os
+import threading
+import http.server
+import pytest
+from conftest import FIXTURES
+from http_tracks import fetch_tracks_http, extract_tracks
+from spotify_playlist_scraper import SpotifyPlaylistScraper
+
+PAGES = os.path.join(FIXTURES, "spotify")
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the saved pages, so /playlist/<id> maps to playlist/<id>.html like on open.spotify.com."""
+    requested = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=PAGES, **kwargs)
+
+    def translate_path(self, path):
+        path = super().translate_path(path)
+        for ext in (".html", ".json"):
+            if os.path.isfile(path + ext):
+                return path + ext
+        return path
+
+    def do_GET(self):
+        FixtureHandler.requested.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def clear_requests():
+    FixtureHandler.requested = []
+
+
+def _read(path):
+    with open(os.path.join(PAGES, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_initial_state_blob(server):
+    tracks = fetch_tracks_http(f"{server}/playlist/initialstate")
+    assert [(t.index, t.title, t.artist, t.album, t.duration_seconds) for t in tracks] == [
+        (1, "Blinding Lights", "The Weeknd", "After Hours", 200),
+        (2, "Levitating", "Dua Lipa, DaBaby", "Future Nostalgia", 203),
+        (3, "Watermelon Sugar", "Harry Styles", "Fine Line", 174),
+    ]
+    assert tracks[0].image_url == "https://i.scdn.co/image/cover1"
+    assert FixtureHandler.requested == ["/playlist/initialstate"]
+
+
+def test_next_data_page(server):
+    tracks = fetch_tracks_http(f"{server}/playlist/nextdata")
+    assert [(t.title, t.artist, t.album, t.duration_seconds) for t in tracks] == [
+        ("Yellow", "Coldplay", "Parachutes", 267),
+        ("Creep", "Radiohead", "Pablo Honey", 239),
+    ]
+    # Smallest album image, like the web player's thumbnail
+    assert tracks[1].image_url == "https://i.scdn.co/image/small2"
+
+
+def test_given_html_is_not_fetched_again(server):
+    tracks = fetch_tracks_http(f"{server}/playlist/nextdata", html=_read("playlist/nextdata.html"))
+    assert len(tracks) == 2
+    assert FixtureHandler.requested == []
+
+
+def test_embed_fallback(server):
+    assert extract_tracks(_read("playlist/embedonly.html")) == ([], None)
+    tracks = fetch_tracks_http(f"{server}/playlist/embedonly?si=abc")
+    assert [(t.title, t.artist, t.duration_seconds) for t in tracks] == [
+        ("Hey Jude", "The Beatles", 431),
+        ("Under Pressure", "Queen, David Bowie", 248),
+    ]
+    assert FixtureHandler.requested == ["/playlist/embedonly?si=abc", "/embed/playlist/embedonly"]
+
+
+def test_paginated_playlist(server):
+    tracks = fetch_tracks_http(f"{server}/playlist/paged")
+    assert [(t.index, t.title) for t in tracks] == [(i, f"Track {i}") for i in range(1, 6)]
+    assert FixtureHandler.requested == ["/playlist/paged", "/api/paged/tracks-2", "/api/paged/tracks-3"]
+
+
+def test_pagination_stops_at_max_pages(server):
+    tracks = fetch_tracks_http(f"{server}/playlist/paged", max_pages=2)
+    assert [t.title for t in tracks] == ["Track 1", "Track 2", "Track 3", "Track 4"]
+
+
+def test_missing_page_returns_none(server):
+    assert fetch_tracks_http(f"{server}/playlist/missing") is None
+
+
+def _scrape(url, engine):
+    """Runs iter_tracks with the browser phase replaced by a recorder."""
+    scraper = SpotifyPlaylistScraper(url, engine=engine)
+    browser_calls = []
+
+    def fake_browser(expected_count, unique_tracks):
+        browser_calls.append(expected_count)
+        return iter(())
+
+    scraper._iter_tracks_browser = fake_browser
+    rows = list(scraper.iter_tracks())
+    return scraper, rows, browser_calls
+
+
+def test_complete_page_stays_on_http(server):
+    scraper, rows, browser_calls = _scrape(f"{server}/playlist/initialstate", "auto")
+    assert scraper.engine_used == "http"
+    assert browser_calls == []
+    assert len(rows) == 3
+    assert scraper.data["playlist_info"]["total_tracks_declared"] == 3
+
+
+def test_short_list_falls_back_to_browser(server):
+    scraper, rows, browser_calls = _scrape(f"{server}/playlist/short", "auto")
+    assert scraper.engine_used == "browser"
+    assert browser_calls == [5]
+    assert rows == []
+
+
+def test_short_list_is_kept_by_http_engine(server):
+    scraper, rows, browser_calls = _scrape(f"{server}/playlist/short", "http")
+    assert scraper.engine_used == "http"
+    assert browser_calls == []
+    assert [row["title"] for row in rows] == ["Only One", "Only Two"]
@@ -0,0 +1,54 @@
+import time
+import threading
+import pytest
+from metadata_cache import MetadataCache, MemoryStore
+
+
+def test_concurrent_misses_share_the_loader_error():
+    cache = MetadataCache(MemoryStore())
+    started, release = threading.Event(), threading.Event()
+    calls, errors = [], []
+
+    def failing_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def waiter():
+        try:
+            cache.get_or_fetch("https://example.com/p", failing_fetch)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=waiter)
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=waiter)
+    follower.start()
+    # The follower is waiting on the leader's flight once it has been counted
+    for _ in range(500):
+        if cache.stats()["coalesced"]:
+            break
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert [str(e) for e in errors] == ["upstream down", "upstream down"]
+    assert cache.stats()["coalesced"] == 1
+
+    # The failure is not cached: the next miss loads again
+    assert cache.get_or_fetch("https://example.com/p", lambda: {"title": "ok"}) == {"title": "ok"}
+
+
+def test_failed_revalidation_is_raised_to_the_caller():
+    cache = MetadataCache(MemoryStore())
+
+    def fetch(validators):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_revalidate("https://example.com/p", fetch)
+    assert cache.get_or_revalidate("https://example.com/p", lambda validators: ("v", {})) == "v"
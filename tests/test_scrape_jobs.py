@@ -0,0 +1,196 @@
+import time
+import threading
+import spotify_playlist_scraper
+from admission import AdmissionController
+from scrape_jobs import ScrapeJobManager
+
+PLAYLIST_URL = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M"
+
+
+class FakeScraper:
+    """Stands in for SpotifyPlaylistScraper: three tracks, released one at a time by `step`."""
+    step = None
+
+    def __init__(self, url, on_progress=None, **kwargs):
+        self.url = url
+        self.on_progress = on_progress
+        self.engine_used = "http"
+        self.timing_report = {}
+        self.data = None
+
+    def iter_tracks(self):
+        tracks = [{"title": f"Song {i}", "artist": "Artist", "album": "Album", "duration": "3:00",
+                   "image_url": "", "index": i} for i in range(1, 4)]
+        for i, track in enumerate(tracks, 1):
+            if FakeScraper.step is not None:
+                FakeScraper.step.acquire(timeout=5)
+            self.on_progress(i, len(tracks))
+            yield track
+        self.data = {
+            "playlist_info": {"url": self.url, "title": "Top Hits", "description": "", "owner": "Spotify",
+                              "image_url": "", "total_tracks_declared": 3, "total_tracks_scraped": 3,
+                              "total_duration_seconds": 540, "total_duration_str": "9 min"},
+            "tracks": tracks,
+        }
+
+
+def _wait_until_finished(client, job_id, timeout=5):
+    for _ in range(int(timeout / 0.05)):
+        status = client.get(f"/scrape-jobs/{job_id}").get_json()
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def _scrape_holding(ticket, result="data"):
+    """Run function shaped like app.run_playlist_scrape: owns the ticket and releases it however it ends."""
+    def run(job):
+        try:
+            if job.cancel_requested:
+                return None
+            with ticket:
+                return result
+        finally:
+            ticket.release()
+    return run
+
+
+def _block_worker(manager):
+    """Occupies the manager's only worker until the returned event is set."""
+    release = threading.Event()
+    manager.submit("https://example.com/busy", lambda job: release.wait(5) and "busy")
+    return release
+
+
+def test_submit_runs_the_job_and_keeps_its_result():
+    manager = ScrapeJobManager(max_workers=1)
+    finished = threading.Event()
+    job, created = manager.submit("https://example.com/p", lambda job: {"tracks": [1, 2]},
+                                  on_done=lambda job: finished.set())
+    assert created
+    assert finished.wait(5)
+    assert job.status == "done"
+    assert job.result == {"tracks": [1, 2]}
+    assert manager.get(job.id) is job
+    assert manager.in_flight(job.key) is None
+    manager.shutdown(wait=True)
+
+
+def test_same_url_joins_the_running_job_and_every_caller_is_notified():
+    manager = ScrapeJobManager(max_workers=1)
+    release = threading.Event()
+    calls, notified = [], []
+
+    def run(job):
+        calls.append(job.id)
+        release.wait(5)
+        return "data"
+
+    job, created = manager.submit("https://example.com/p", run, on_done=notified.append)
+    joined, joined_created = manager.submit("https://example.com/p", run, on_done=notified.append)
+    assert created and not joined_created
+    assert joined is job
+
+    release.set()
+    manager.shutdown(wait=True)
+    assert calls == [job.id]
+    assert notified == [job, job]
+
+
+def test_failed_job_records_the_error():
+    manager = ScrapeJobManager(max_workers=1)
+
+    def run(job):
+        raise RuntimeError("boom")
+
+    job, _ = manager.submit("https://example.com/p", run)
+    manager.shutdown(wait=True)
+    assert job.status == "failed"
+    assert "boom" in job.error
+
+
+def test_scrape_job_routes_report_progress_and_result(app, monkeypatch):
+    monkeypatch.setattr(spotify_playlist_scraper, "SpotifyPlaylistScraper", FakeScraper)
+    step = FakeScraper.step = threading.Semaphore(0)
+    client = app.test_client()
+    try:
+        response = client.post("/scrape-playlist", json={"url": PLAYLIST_URL})
+        assert response.status_code == 202
+        job = response.get_json()
+        assert client.post("/scrape-playlist", json={"url": PLAYLIST_URL + "?si=abc"}).get_json()["job_id"] == job["job_id"]
+        assert client.get(job["result_url"]).status_code == 202
+
+        step.release()
+        for _ in range(100):
+            progress = client.get(job["status_url"]).get_json()["progress"]
+            if progress["collected"]:
+                break
+            time.sleep(0.05)
+        assert progress == {"collected": 1, "expected": 3}
+
+        step.release()
+        step.release()
+        assert _wait_until_finished(client, job["job_id"])["status"] == "done"
+    finally:
+        FakeScraper.step = None
+
+    result = client.get(job["result_url"]).get_json()
+    assert [t["title"] for t in result["tracks"]] == ["Song 1", "Song 2", "Song 3"]
+    assert result["playlist_info"]["title"] == "Top Hits"
+    assert client.get("/scrape-jobs/missing").status_code == 404
+
+
+def test_job_cancelled_while_queued_releases_its_ticket():
+    manager = ScrapeJobManager(max_workers=1)
+    admission = AdmissionController(max_active=1, max_queued=1)
+    release = _block_worker(manager)
+
+    ticket = admission.reserve()
+    finished = threading.Event()
+    job, created = manager.submit("https://example.com/p", _scrape_holding(ticket),
+                                  on_done=lambda job: finished.set())
+    assert created
+    assert manager.cancel(job.id)
+    release.set()
+
+    assert finished.wait(5)
+    assert job.status == "cancelled"
+    assert admission.stats()["queued"] == 0
+    assert admission.stats()["active"] == 0
+    manager.shutdown(wait=True)
+
+
+def test_cancel_unless_joined_spares_jobs_with_waiting_users():
+    manager = ScrapeJobManager(max_workers=1)
+    release = _block_worker(manager)
+
+    finished = threading.Event()
+    job, _ = manager.submit("https://example.com/p", lambda job: "data", key="p")
+    joined, created = manager.submit("https://example.com/p", lambda job: "other", key="p",
+                                     on_done=lambda job: finished.set())
+    assert joined is job and not created
+    assert not job.cancel(unless_joined=True)
+
+    release.set()
+    assert finished.wait(5)
+    assert job.status == "done"
+    manager.shutdown(wait=True)
+
+
+def test_submission_does_not_join_a_job_being_cancelled():
+    manager = ScrapeJobManager(max_workers=1)
+    release = _block_worker(manager)
+
+    finished = threading.Event()
+    job, _ = manager.submit("https://example.com/p", lambda job: "data", key="p")
+    assert job.cancel(unless_joined=True)
+    fresh, created = manager.submit("https://example.com/p", lambda job: "data", key="p",
+                                    on_done=lambda job: finished.set())
+    assert created and fresh is not job
+
+    release.set()
+    assert finished.wait(5)  # One worker: the cancelled job has finished before the fresh one
+    assert job.status == "cancelled"
+    assert fresh.status == "done"
+    manager.shutdown(wait=True)
@@ -0,0 +1,57 @@
+import app as app_module
+
+URL = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M"
+
+
+def _scrape(title, count, declared):
+    tracks = [{"title": f"Song {i}", "artist": "Artist", "album": "Album", "duration": "3:00",
+               "image_url": "", "index": i} for i in range(1, count + 1)]
+    return {
+        "playlist_info": {"url": URL + "?si=abc", "title": title, "description": "", "owner": "Spotify",
+                          "image_url": "", "total_tracks_declared": declared, "total_tracks_scraped": count,
+                          "total_duration_seconds": 180 * count, "total_duration_str": ""},
+        "tracks": tracks,
+    }
+
+
+def test_first_snapshot_is_stored(app):
+    with app.app_context():
+        playlist_id, diff, stored = app_module.save_playlist_snapshot(_scrape("Hits", 3, 3))
+        assert stored
+        assert len(diff["added"]) == 3
+        data = app_module.load_playlist(URL)
+        assert data["snapshot"]["playlist_id"] == playlist_id
+        assert [t["title"] for t in data["tracks"]] == ["Song 1", "Song 2", "Song 3"]
+
+
+def test_partial_scrape_keeps_the_complete_snapshot(app):
+    with app.app_context():
+        playlist_id, _, _ = app_module.save_playlist_snapshot(_scrape("Hits", 3, 3))
+        again, diff, stored = app_module.save_playlist_snapshot(_scrape("Hits (renamed)", 1, 4))
+        assert (again, diff, stored) == (playlist_id, None, False)
+
+        previous = app_module.previous_snapshot(URL)
+        assert previous["snapshot"]["source"] == "previous"
+        assert previous["playlist_info"]["title"] == "Hits"
+        assert previous["playlist_info"]["total_tracks_scraped"] == 3
+
+
+def test_partial_first_scrape_is_stored_flagged(app):
+    with app.app_context():
+        _, _, stored = app_module.save_playlist_snapshot(_scrape("Hits", 1, 4))
+        assert stored
+        assert app_module.load_playlist(URL) is None
+        _, _, stored = app_module.save_playlist_snapshot(_scrape("Hits", 4, 4))
+        assert stored
+        assert app_module.load_playlist(URL)["playlist_info"]["total_tracks_scraped"] == 4
+
+
+def test_upsert_reuses_existing_tracks(app):
+    with app.app_context():
+        tracks = _scrape("Hits", 3, 3)["tracks"]
+        first = app_module.upsert_tracks(tracks[:2])
+        app_module.db.session.commit()
+        ids = app_module.upsert_tracks(tracks + tracks[:1])
+        assert ids[:2] == first
+        assert ids[3] == ids[0]
+        assert app_module.Track.query.count() == 3
@@ -0,0 +1,69 @@
+import subprocess
+import pytest
+import youtube_lookup
+from metadata_cache import MetadataCache, MemoryStore
+from youtube_lookup import YouTubeResolver, search_video_id, ytdlp_video_id
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeClient:
+    rate_limiter = None
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(*responses):
+        fake = FakeClient(*responses)
+        monkeypatch.setattr(youtube_lookup, "get_http_client", lambda: fake)
+        return fake
+    return install
+
+
+def test_search_ignores_error_pages(client):
+    # An error page may still mention video ids (e.g. suggestions); they are not results
+    client(FakeResponse(503, '"videoId":"aaaaaaaaaaa"'))
+    assert search_video_id("song") is None
+
+
+def test_failed_search_is_not_cached(client):
+    fake = client(FakeResponse(429), FakeResponse(200, 'x "videoId":"dQw4w9WgXcQ" y'))
+    resolver = YouTubeResolver(MetadataCache(MemoryStore()))
+    assert resolver.resolve("song") is None
+    assert resolver.resolve("song") == "dQw4w9WgXcQ"
+    assert resolver.resolve("Song ") == "dQw4w9WgXcQ"
+    assert fake.calls == 2
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError("yt-dlp"), subprocess.TimeoutExpired("yt-dlp", 30)])
+def test_ytdlp_failures_return_none(client, monkeypatch, error):
+    client()
+
+    def run(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(subprocess, "run", run)
+    assert ytdlp_video_id("song") is None
+
+
+def test_missing_ytdlp_is_a_404(app, client, monkeypatch):
+    client()
+
+    def run(*args, **kwargs):
+        raise FileNotFoundError("yt-dlp")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    response = app.test_client().post("/get-youtube-url", json={"query": "song"})
+    assert response.status_code == 404
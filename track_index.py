@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+from tracks import parse_duration
+
+SORT_KEYS = ("index", "title", "artist", "album", "duration")
+MAX_PAGE_SIZE = 500
+
+
+class TrackIndex:
+    """
+    Read-only query index over one playlist's tracks.
+
+    Every sort order is computed once when the index is built, along with a
+    lowercase "title artist album" string per track. Paging an unfiltered
+    list is then a slice of a precomputed order; a search scans the lowercase
+    strings once and its filtered order is kept, so following pages of the
+    same search are slices as well.
+    """
+
+    def __init__(self, tracks, max_cached_queries=16):
+        """
+        :param tracks: Track dicts (or Track objects) in playlist order
+        :param max_cached_queries: Filtered orders kept per index
+        """
+        self.tracks = list(tracks)
+        count = len(self.tracks)
+        keys = {
+            "index": [t.get("index") or i + 1 for i, t in enumerate(self.tracks)],
+            "title": [(t.get("title") or "").casefold() for t in self.tracks],
+            "artist": [(t.get("artist") or "").casefold() for t in self.tracks],
+            "album": [(t.get("album") or "").casefold() for t in self.tracks],
+            "duration": [_seconds(t) for t in self.tracks],
+        }
+        self._orders = {(name, "asc"): sorted(range(count), key=values.__getitem__) for name, values in keys.items()}
+        # Descending orders are read backwards, except duration: unknown durations stay last
+        durations = keys["duration"]
+        self._orders[("duration", "desc")] = sorted(range(count), key=lambda i: (durations[i][0], -durations[i][1]))
+        self._search = [f"{t.get('title') or ''}\x1f{t.get('artist') or ''}\x1f{t.get('album') or ''}".lower()
+                        for t in self.tracks]
+        self._filtered = OrderedDict()  # (query, (sort, order)) -> filtered order
+        self._max_cached_queries = max_cached_queries
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def query(self, sort="index", order="asc", q="", offset=0, limit=50):
+        """
+        One page of tracks.
+
+        :param sort: One of SORT_KEYS
+        :param order: "asc" or "desc"
+        :param q: Case-insensitive substring matched against title, artist and album
+        :param offset: Matching tracks to skip
+        :param limit: Page size (1..MAX_PAGE_SIZE)
+        :return: {"tracks", "total", "matched", "offset", "limit", "sort", "order", "q", "next_offset"}
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Unsupported sort order: {order}")
+        offset = max(0, int(offset))
+        limit = min(max(1, int(limit)), MAX_PAGE_SIZE)
+        q = (q or "").strip().lower()
+
+        key = (sort, order) if (sort, order) in self._orders else (sort, "asc")
+        positions = self._filtered_order(q, key) if q else self._orders[key]
+        matched = len(positions)
+        if key[1] == order:
+            page = positions[offset:offset + limit]
+        else:
+            end = matched - offset
+            page = positions[max(0, end - limit):max(0, end)][::-1]
+
+        next_offset = offset + limit if offset + limit < matched else None
+        return {
+            "tracks": [_as_dict(self.tracks[i]) for i in page],
+            "total": len(self.tracks),
+            "matched": matched,
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "order": order,
+            "q": q,
+            "next_offset": next_offset,
+        }
+
+    def _filtered_order(self, q, order_key):
+        key = (q, order_key)
+        with self._lock:
+            cached = self._filtered.get(key)
+            if cached is not None:
+                self._filtered.move_to_end(key)
+                return cached
+
+        search = self._search
+        positions = [i for i in self._orders[order_key] if q in search[i]]
+
+        with self._lock:
+            self._filtered[key] = positions
+            while len(self._filtered) > self._max_cached_queries:
+                self._filtered.popitem(last=False)
+        return positions
+
+
+class TrackIndexCache:
+    """
+    Bounded LRU of TrackIndex objects, keyed by whatever identifies a result
+    (a scrape job id, a stored playlist id plus its scrape time, ...).
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """
+        Returns the index for `key`, building it from `load()` (an iterable of
+        tracks) on a miss.
+        """
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        index = TrackIndex(load())
+
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._indexes), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# ---------------------------------------------------------
+# INTERNAL / HELPER FUNCTIONS
+# ---------------------------------------------------------
+
+def _seconds(track):
+    """(unknown, seconds) so unknown durations sort after every known one."""
+    seconds = track.get("duration_seconds") if "duration_seconds" in track else parse_duration(track.get("duration"))
+    return (seconds is None, seconds or 0)
+
+
+def _as_dict(track):
+    return track if isinstance(track, dict) else track.to_dict()
@@ -0,0 +1,116 @@
+import sys
+
+
+def parse_duration(text):
+    """"m:ss" / "h:mm:ss" -> seconds, or None when missing/unparseable ("Unknown")."""
+    if not text or text == "Unknown":
+        return None
+    try:
+        parts = list(map(int, text.split(':')))
+    except ValueError:
+        return None
+    if len(parts) == 3:
+        return parts[0] * 3600 + parts[1] * 60 + parts[2]
+    if len(parts) == 2:
+        return parts[0] * 60 + parts[1]
+    return None
+
+
+def format_duration(seconds):
+    """seconds -> "m:ss" / "h:mm:ss" as Spotify shows it, "Unknown" for None."""
+    if seconds is None:
+        return "Unknown"
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_total_duration(seconds):
+    """Playlist length as Spotify shows it: "1 hr 5 min" / "42 min"."""
+    if not seconds:
+        return "0 min"
+    hours, minutes = divmod(int(seconds) // 60, 60)
+    if hours:
+        return f"{hours} hr {minutes} min"
+    return f"{minutes} min"
+
+
+class Track:
+    """
+    Compact in-memory track.
+
+    Uses __slots__ instead of a per-instance dict, keeps the duration as
+    integer seconds and interns artist/album strings, which repeat heavily
+    within a playlist. Supports read-only mapping access (track["title"],
+    track.get(...), dict(track)) so code written against the old track dicts
+    keeps working; to_dict() gives the exact dict that goes into JSON output.
+    """
+
+    __slots__ = ("title", "artist", "album", "duration_seconds", "image_url", "index")
+
+    # Key order of the serialized track dict
+    FIELDS = ("title", "artist", "album", "duration", "image_url", "index")
+
+    def __init__(self, title, artist, album, duration_seconds=None, image_url="", index=None):
+        self.title = title
+        self.artist = sys.intern(artist)
+        self.album = sys.intern(album)
+        self.duration_seconds = duration_seconds
+        self.image_url = image_url
+        self.index = index
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a Track from a track dict with a "duration" text."""
+        return cls(
+            title=data.get("title", ""),
+            artist=data.get("artist") or "Unknown Artist",
+            album=data.get("album") or "Unknown Album",
+            duration_seconds=parse_duration(data.get("duration")),
+            image_url=data.get("image_url", ""),
+            index=data.get("index")
+        )
+
+    @property
+    def duration(self):
+        return format_duration(self.duration_seconds)
+
+    def to_dict(self):
+        data = {
+            "title": self.title,
+            "artist": self.artist,
+            "album": self.album,
+            "duration": self.duration,
+            "image_url": self.image_url
+        }
+        if self.index is not None:
+            data["index"] = self.index
+        return data
+
+    # Mapping protocol (read-only)
+
+    def keys(self):
+        return self.FIELDS if self.index is not None else self.FIELDS[:-1]
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __eq__(self, other):
+        if isinstance(other, Track):
+            return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Track({self.index}: {self.title!r} by {self.artist!r}, {self.duration})"
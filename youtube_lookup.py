@@ -0,0 +1,101 @@
+import re
+import subprocess
+from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
+from http_client import get_http_client
+
+VIDEO_ID_RE = re.compile(r'"videoId":"([A-Za-z0-9_-]{11})"')
+
+
+def music_query(music_name):
+    """Turns "music by artist" into a "music artist" search query."""
+    if ' by ' in music_name.lower():
+        parts = music_name.lower().split(' by ')
+        if len(parts) == 2:
+            return f"{parts[0].strip()} {parts[1].strip()}"
+    return music_name
+
+
+def normalize_query(query):
+    """Cache key for a search query: lowercase with collapsed whitespace."""
+    return ' '.join(query.lower().split())
+
+
+def search_video_id(query, timeout=10):
+    """
+    First video id on the YouTube results page for `query`, or None.
+    None (also returned when YouTube answers with an error page) is never cached.
+    """
+    url = f"https://www.youtube.com/results?search_query={quote_plus(query)}"
+    response = get_http_client().get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+    if response.status_code != 200:
+        print(f"YouTube search returned {response.status_code} ({query})")
+        return None
+    match = VIDEO_ID_RE.search(response.text)
+    return match.group(1) if match else None
+
+
+def ytdlp_video_id(query, timeout=30):
+    """First video id yt-dlp finds for `query`, or None (also when yt-dlp is missing or times out)."""
+    # yt-dlp makes its own requests, but they count against YouTube's rate limit all the same
+    limiter = get_http_client().rate_limiter
+    if limiter:
+        limiter.acquire("www.youtube.com")
+    try:
+        result = subprocess.run(
+            ["yt-dlp", f"ytsearch1:{query}", "--print", "%(id)s"],
+            capture_output=True, text=True, timeout=timeout
+        )
+    except FileNotFoundError:
+        print("yt-dlp is not installed")
+        return None
+    except subprocess.TimeoutExpired:
+        print(f"yt-dlp timed out after {timeout}s ({query})")
+        return None
+    video_id = result.stdout.strip().splitlines()[0] if result.stdout.strip() else ""
+    return video_id if re.fullmatch(r'[A-Za-z0-9_-]{11}', video_id) else None
+
+
+def video_links(video_id, embed_params="autoplay=1"):
+    return {
+        "embed_url": f"https://www.youtube-nocookie.com/embed/{video_id}?{embed_params}",
+        "youtube_url": f"https://www.youtube.com/watch?v={video_id}",
+        "video_id": video_id
+    }
+
+
+class YouTubeResolver:
+    """
+    Resolves search queries to video ids through a persistent query -> videoId cache.
+    Batches are resolved concurrently on a bounded thread pool.
+    """
+
+    def __init__(self, cache, max_workers=8):
+        """
+        :param cache: MetadataCache (typically SQLite-backed) holding query -> video id
+        :param max_workers: Upper bound on concurrent YouTube searches
+        """
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="youtube")
+
+    def resolve(self, query, search=search_video_id, source="results"):
+        """
+        Returns the video id for `query`, searching YouTube only on a cache miss.
+        :param search: Callable(query) -> video id used on a miss
+        :param source: Cache namespace, so different search backends keep separate entries
+        """
+        key = f"youtube-{source}:{normalize_query(query)}"
+        return self.cache.get_or_fetch_key(key, lambda: search(query))
+
+    def resolve_many(self, queries):
+        """Resolves several queries concurrently. Returns {query: video id or None}."""
+        unique = list(dict.fromkeys(q for q in queries if q))
+        futures = {q: self._executor.submit(self._resolve_quietly, q) for q in unique}
+        return {q: future.result() for q, future in futures.items()}
+
+    def _resolve_quietly(self, query):
+        try:
+            return self.resolve(query)
+        except Exception as e:
+            print(f"YouTube lookup error ({query}): {e}")
+            return None